@@ -18,13 +18,13 @@ import time
 from obspy import UTCDateTime
 from io import BytesIO
 import xlsxwriter
-from waveform_visualizer import WaveformVisualizer
+from waveform_visualizer import get_waveform_visualizer
 import folium.plugins
 
 # ==========================================
 # TILFØJ: Import af egne moduler
 # ==========================================
-from toast_manager import ToastManager
+from toast_manager import get_toast_manager
 from seismic_processor import EnhancedSeismicProcessor
 from data_manager import StreamlinedDataManager
 
@@ -39,7 +39,7 @@ except ImportError:
     st.error("❌ ObsPy er påkrævet for fuld funktionalitet. Installer med: pip install obspy")
 
 # Import tekster direkte
-from texts import texts, help_texts
+from texts import get_texts, t
 
 # Konfiguration
 st.set_page_config(
@@ -198,8 +198,9 @@ class GEOSeisV2:
         # CACHED MANAGERS - Initialiseres kun én gang!
         # ==========================================
         
-        # Toast Manager (lightweight - behøver ikke caching)
-        self.toast_manager = ToastManager()
+        # Toast Manager - CACHED (tilstand pr. session ligger i session_state)
+        self.toast_manager = get_toast_manager()
+        self.toast_manager.begin_run()
         
         # Data Manager - CACHED
         if OBSPY_AVAILABLE:
@@ -221,8 +222,8 @@ class GEOSeisV2:
         else:
             self.processor = None
         
-        # Waveform Visualizer (lightweight - behøver ikke caching)
-        self.visualizer = WaveformVisualizer()
+        # Waveform Visualizer - CACHED (ingen tilstand, deles af alle sessioner)
+        self.visualizer = get_waveform_visualizer()
         
         # Check IRIS forbindelse
         if self.data_manager and not self.data_manager.client:
@@ -700,14 +701,15 @@ class GEOSeisV2:
             
     def render_header(self):
         """Renderer kompakt header med sprog toggle"""
+        T = get_texts(st.session_state.language)
         st.markdown(f'''
         <div class="main-header">
             <div class="header-content">
                 <div class="title-section">
                     <span class="earth-emoji">🌍</span>
                     <div class="title-text">
-                        <h1 class="main-title">{texts[st.session_state.language]["app_title"]}</h1>
-                        <p class="main-subtitle">{texts[st.session_state.language]["app_subtitle"]}</p>
+                        <h1 class="main-title">{T["app_title"]}</h1>
+                        <p class="main-subtitle">{T["app_subtitle"]}</p>
                     </div>
                 </div>
                 <div class="language-flags">
@@ -723,18 +725,19 @@ class GEOSeisV2:
         ''', unsafe_allow_html=True)
     def render_sidebar(self):
             """Render the sidebar navigation - kun knapper"""
+            T = get_texts(st.session_state.language)
             with st.sidebar:
                 # Logo/Title
                 st.markdown("## 🌍 GEOSeis 2.0")
                 st.markdown("---")
                 
                 # Startside
-                if st.button(texts[st.session_state.language]['nav_home'], use_container_width=True,
+                if st.button(T['nav_home'], use_container_width=True,
                             type="primary" if st.session_state.current_view == 'start' else "secondary"):
                     st.session_state.current_view = 'start'
                 
                 # Søg jordskælv
-                if st.button(texts[st.session_state.language]['nav_earthquake_search'], use_container_width=True,
+                if st.button(T['nav_earthquake_search'], use_container_width=True,
                             type="primary" if st.session_state.current_view == 'data_search' else "secondary"):
                     st.session_state.current_view = 'data_search'
                 
@@ -745,25 +748,25 @@ class GEOSeisV2:
                 
                 # Seismogram - kun synlig hvis en station er valgt
                 if st.session_state.get('selected_station'):
-                    if st.button(texts[st.session_state.language]['waveform_title'], use_container_width=True,
+                    if st.button(T['waveform_title'], use_container_width=True,
                                 type="primary" if st.session_state.current_view == 'analysis_waveform' else "secondary"):
                         st.session_state.current_view = 'analysis_waveform'
                 
                 # Magnitude beregning - kun synlig hvis vi har waveform data
                 if st.session_state.get('waveform_data'):
-                    if st.button(texts[st.session_state.language]['nav_magnitude_calc'], use_container_width=True,
+                    if st.button(T['nav_magnitude_calc'], use_container_width=True,
                                 type="primary" if st.session_state.current_view == 'analysis_magnitude' else "secondary"):
                         st.session_state.current_view = 'analysis_magnitude'
                 
                 # Excel export - kun synlig hvis vi har data
                 if st.session_state.get('waveform_data'):
-                    if st.button(texts[st.session_state.language]['nav_export'], use_container_width=True,
+                    if st.button(T['nav_export'], use_container_width=True,
                                 type="primary" if st.session_state.current_view == 'tools_export' else "secondary"):
                         st.session_state.current_view = 'tools_export'
                 
                 # Om sektion
                 st.markdown("---")
-                if st.button(texts[st.session_state.language]['nav_about'], use_container_width=True,
+                if st.button(T['nav_about'], use_container_width=True,
                             type="primary" if st.session_state.current_view == 'about' else "secondary"):
                     st.session_state.current_view = 'about'
 
@@ -842,7 +845,8 @@ class GEOSeisV2:
 
     def render_data_search_view(self):
         """Render the earthquake search view"""
-        st.markdown(f"## {texts[st.session_state.language]['nav_earthquake_search']}")
+        T = get_texts(st.session_state.language)
+        st.markdown(f"## {T['nav_earthquake_search']}")
         
         # Variabler til at holde form værdier
         mag_range = None
@@ -852,47 +856,47 @@ class GEOSeisV2:
         
         # Search form
         with st.form("earthquake_search"):
-            st.markdown(f"### {texts[st.session_state.language]['search_criteria']}")
+            st.markdown(f"### {T['search_criteria']}")
             
             col1, col2 = st.columns(2)
             
             with col1:
                 mag_range = st.slider(
-                    texts[st.session_state.language]['magnitude_range'],
+                    T['magnitude_range'],
                     min_value=4.0,
                     max_value=9.0,
                     value=st.session_state.magnitude_range,
                     step=0.1,
-                    help=texts[st.session_state.language]['magnitude_help']
+                    help=T['magnitude_help']
                 )
                 
                 year_range = st.slider(
-                    texts[st.session_state.language]['date_range'],
+                    T['date_range'],
                     min_value=1990,
                     max_value=datetime.now().year,
                     value=st.session_state.year_range,
-                    help=texts[st.session_state.language]['date_help']
+                    help=T['date_help']
                 )
             
             with col2:
                 depth_range = st.slider(
-                    texts[st.session_state.language]['depth_range'],
+                    T['depth_range'],
                     min_value=0,
                     max_value=700,
                     value=st.session_state.depth_range,
                     step=10,
-                    help=texts[st.session_state.language]['depth_help']
+                    help=T['depth_help']
                 )
                 
                 max_results = st.number_input(
-                    texts[st.session_state.language]['max_results'],
+                    T['max_results'],
                     min_value=1,
                     max_value=100,
                     value=25
                 )
             
             submitted = st.form_submit_button(
-                texts[st.session_state.language]['search_button'],
+                T['search_button'],
                 type="primary"
             )
             
@@ -920,7 +924,7 @@ class GEOSeisV2:
             # Reset submitted flag
             st.session_state.form_submitted = False
             
-            with st.spinner(texts[st.session_state.language]['loading']):
+            with st.spinner(T['loading']):
                 earthquakes = self.data_manager.fetch_latest_earthquakes(
                     magnitude_range=mag_range,
                     year_range=year_range,
@@ -1057,12 +1061,13 @@ class GEOSeisV2:
 
     def render_start_view(self):
         """Render the start view with latest earthquakes - Kortfattet version"""
+        T = get_texts(st.session_state.language)
         # To kolonner layout
         col_text, col_map = st.columns([1, 2])
         
         with col_text:
             # Overskrift
-            st.markdown(f"### {texts[st.session_state.language]['welcome_title']}")
+            st.markdown(f"### {T['welcome_title']}")
             
             # Kort intro tekst
             if st.session_state.language == 'da':
@@ -1110,13 +1115,13 @@ class GEOSeisV2:
             
         with col_map:
             # Kort overskrift
-            st.markdown(f"#### {texts[st.session_state.language]['welcome_subtitle']}")
+            st.markdown(f"#### {T['welcome_subtitle']}")
             
             # Hent og vis jordskælv på kort
             if self.data_manager and OBSPY_AVAILABLE:
                 # Check cache først
                 if 'latest_earthquakes' not in st.session_state or not st.session_state.latest_earthquakes:
-                    with st.spinner(texts[st.session_state.language]['loading_earthquakes']):
+                    with st.spinner(T['loading_earthquakes']):
                         try:
                             # Hent seneste store jordskælv
                             earthquakes = self.data_manager.get_latest_significant_earthquakes(
@@ -1592,51 +1597,52 @@ class GEOSeisV2:
     
     def render_data_view(self):
         """Render the data selection and search view"""
-        st.markdown(f"## {texts[st.session_state.language]['search_title']}")
+        T = get_texts(st.session_state.language)
+        st.markdown(f"## {T['search_title']}")
         
         # Search form
         with st.form("earthquake_search"):
-            st.markdown(f"### {texts[st.session_state.language]['search_criteria']}")
+            st.markdown(f"### {T['search_criteria']}")
             
             col1, col2 = st.columns(2)
             
             with col1:
                 mag_range = st.slider(
-                    texts[st.session_state.language]['magnitude_range'],
+                    T['magnitude_range'],
                     min_value=4.0,
                     max_value=9.0,
                     value=st.session_state.magnitude_range,
                     step=0.1,
-                    help=texts[st.session_state.language]['magnitude_help']
+                    help=T['magnitude_help']
                 )
                 
                 year_range = st.slider(
-                    texts[st.session_state.language]['date_range'],
+                    T['date_range'],
                     min_value=1990,
                     max_value=datetime.now().year,
                     value=st.session_state.year_range,
-                    help=texts[st.session_state.language]['date_help']
+                    help=T['date_help']
                 )
             
             with col2:
                 depth_range = st.slider(
-                    texts[st.session_state.language]['depth_range'],
+                    T['depth_range'],
                     min_value=0,
                     max_value=700,
                     value=st.session_state.depth_range,
                     step=10,
-                    help=texts[st.session_state.language]['depth_help']
+                    help=T['depth_help']
                 )
                 
                 max_results = st.number_input(
-                    texts[st.session_state.language]['max_results'],
+                    T['max_results'],
                     min_value=1,
                     max_value=100,
                     value=25
                 )
             
             submitted = st.form_submit_button(
-                texts[st.session_state.language]['search_button'],
+                T['search_button'],
                 type="primary"
             )
             
@@ -1645,7 +1651,7 @@ class GEOSeisV2:
                 st.session_state.year_range = year_range
                 st.session_state.depth_range = depth_range
                 
-                with st.spinner(texts[st.session_state.language]['loading']):
+                with st.spinner(T['loading']):
                     import time
                     time.sleep(2)
                 
@@ -1654,7 +1660,7 @@ class GEOSeisV2:
 
     def render_analysis_waveform_view(self):
         """Render waveform viewer med samme layout som magnitude siden"""
-       # st.markdown(f"## {texts[st.session_state.language]['nav_waveform_viewer']}")
+       # st.markdown(f"## {t(st.session_state.language, 'nav_waveform_viewer')}")
         
         # Check for selected station
         if 'selected_station' not in st.session_state or st.session_state.selected_station is None:
@@ -2202,7 +2208,7 @@ class GEOSeisV2:
        
     def render_analysis_magnitude_view(self):
         """Render magnitude calculation view"""
-        st.markdown(f"## {texts[st.session_state.language]['nav_magnitude_calc']}")
+        st.markdown(f"## {t(st.session_state.language, 'nav_magnitude_calc')}")
         
         # Check om vi har nødvendige data
         if not st.session_state.get('selected_station'):
@@ -2437,6 +2443,8 @@ class GEOSeisV2:
                         
                         # Gem resultat
                         st.session_state.ms_result = ms_result
+                        if ms_result is not None:
+                            explanation = self.processor.format_ms_explanation(explanation)
                         st.session_state.ms_explanation = explanation
                         st.session_state.ms_window = {
                             'start': window_start,
@@ -2645,15 +2653,10 @@ class GEOSeisV2:
                     if dominant_comp is not None and len(dominant_comp) > 0:
                         # Beregn FFT direkte her i stedet for at kalde ikke-eksisterende metode
                         try:
-                            # FFT beregning
-                            n = len(dominant_comp)
-                            fft_vals = np.fft.fft(dominant_comp)
-                            fft_freq = np.fft.fftfreq(n, 1/sampling_rate)
-                            
-                            # Kun positive frekvenser
-                            pos_mask = fft_freq > 0
-                            frequencies = fft_freq[pos_mask]
-                            fft_amps = np.abs(fft_vals[pos_mask]) * 2 / n  # Normaliser
+                            # FFT beregning - reel FFT, kun positive frekvenser
+                            frequencies, fft_amps = self.processor.amplitude_spectrum(
+                                dominant_comp, sampling_rate
+                            )
                             
                             # Konverter til perioder
                             with np.errstate(divide='ignore', invalid='ignore'):
@@ -2863,7 +2866,7 @@ class GEOSeisV2:
 
     def render_tools_export_view(self):
         """Render export tools view - kompakt version med tydelig filtrering og highres support"""
-        st.markdown(f"## {texts[st.session_state.language]['nav_export']}")
+        st.markdown(f"## {t(st.session_state.language, 'nav_export')}")
         
         # Check om vi har data at eksportere
         if ('waveform_data' not in st.session_state or 
@@ -3133,7 +3136,7 @@ class GEOSeisV2:
 
     def render_about_view(self):
         """Render about page - Kortfattet version"""
-        st.markdown(f"## {texts[st.session_state.language]['nav_about']}")
+        st.markdown(f"## {t(st.session_state.language, 'nav_about')}")
         
         col1, col2 = st.columns([2, 1])
         
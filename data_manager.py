@@ -19,31 +19,399 @@ PRINCIPPER:
 
 import streamlit as st
 from obspy.clients.fdsn import Client
-from obspy import UTCDateTime, Stream
-from obspy.taup import TauPyModel
-from obspy.geodetics import gps2dist_azimuth, kilometers2degrees, locations2degrees
+from obspy.clients.fdsn.header import FDSNException
+from obspy import UTCDateTime, Stream, read_inventory
+from obspy.geodetics import kilometers2degrees
+from taup_model import get_cached_taup_model
 import numpy as np
 import pandas as pd
 import time
+import math
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 import warnings
+import logging
 import gc
+import copy
 import re
 import threading
 from typing import Dict, List, Tuple, Optional, Any
 from io import BytesIO
+from functools import lru_cache
+from types import MappingProxyType
+import xml.etree.ElementTree as ET
 import xlsxwriter
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Valgfri: numexpr til multi-threaded vektoriseret afstandsberegning
+try:
+    import numexpr as ne
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
-def get_cached_taup_model():
-    """Returnerer cached TauPyModel instans"""
-    if 'taup_model' not in st.session_state:
-        print("Creating new TauPyModel instance...")
-        st.session_state.taup_model = TauPyModel(model="iasp91")
-    return st.session_state.taup_model
+# Debug output fra download/processering - slås til med logging.DEBUG
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=4096)
+def taup_p_s_times(depth_km, distance_deg):
+    """
+    Første P og S ankomst (sekunder) fra TauP. Kaldes med afrundet dybde (km)
+    og afstand (0.01°), så cachen deles af stationer i samme afstandsbin.
+    NaN hvis fasen ikke findes.
+    """
+    p_seconds = np.nan
+    s_seconds = np.nan
+    arrivals = get_cached_taup_model().get_travel_times(
+        source_depth_in_km=depth_km,
+        distance_in_degree=distance_deg,
+        phase_list=["P", "S"]
+    )
+    for arrival in arrivals:
+        if arrival.phase.name == "P" and np.isnan(p_seconds):
+            p_seconds = arrival.time
+        elif arrival.phase.name == "S" and np.isnan(s_seconds):
+            s_seconds = arrival.time
+    return p_seconds, s_seconds
+
+@st.cache_resource(show_spinner=False)
+def get_iris_client():
+    """
+    Returnerer IRIS client delt af alle sessioner i processen.
+    Service discovery sker derfor kun én gang.
+    """
+    return Client("IRIS", timeout=30)
+
+def create_http_session():
+    """Opretter requests session med connection pool og automatiske retries"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET', 'HEAD']
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# Rå event kolonner fra catalog/QuakeML parsing (dybde i meter)
+EVENT_COLUMNS = [
+    'time', 'latitude', 'longitude', 'depth_m',
+    'magnitude', 'magnitude_type', 'location', 'resource_id'
+]
+
+# Kanaltyper der søges efter ved stationssøgning
+STATION_CHANNELS = ["BH?", "HH?", "SH?", "EH?"]
+
+# Prioriterede netværk scoring (lavere er bedre)
+NETWORK_SCORES = {
+    'IU': 1, 'II': 0,  # GSN - højeste prioritet
+    'G': 2, 'GE': 2,   # GEOSCOPE/GEOFON
+    'GT': 3, 'US': 4, 'CN': 4,  # Andre høj-kvalitet
+}
+
+# Kanal prioritet efter båndkode + instrumentkode (lavere er bedre).
+# Øvrige ?H? kanaler får prioritet 3.
+CHANNEL_BUCKETS = {'HH': 1, 'BH': 2}
+OTHER_CHANNEL_PRIORITY = 3
+
+# Komponent kode -> standard navn. Rækkefølgen afgør hvilken kode der
+# vinder når både fx Z og 3 findes.
+COMPONENT_MAP = MappingProxyType({
+    'Z': 'vertical',
+    'N': 'north',
+    'E': 'east',
+    '1': 'north',
+    '2': 'east',
+    '3': 'vertical'
+})
+
+# Typisk sampling rate (Hz) per kanal prioritet
+TYPICAL_SAMPLE_RATES = {1: 100, 2: 40}
+
+EARTH_RADIUS_KM = 6371.0
+
+# Max antal kandidater der hentes kanal-metadata for via station index
+INDEX_CANDIDATE_LIMIT = 200
+
+# Sekunder efter en fejlet station index download hvor sessionen går direkte
+# til IRIS radius søgning i stedet for at prøve den globale download igen
+STATION_INDEX_RETRY_S = 300
+
+# Global station index: genopbygges dagligt (nye/lukkede station epoker) og
+# hentes med længere timeout end almindelige IRIS kald (stort svar)
+STATION_INDEX_TTL_S = 86400
+STATION_INDEX_TIMEOUT_S = 120
+
+# Fuld gc.collect() ved cache rydning kun hvis cachen holdt mindst så meget array/bytes data (MB)
+GC_CACHE_THRESHOLD_MB = 100
+
+# Kompakt kanal-tabel (én række per kanal) - erstatter ObsPy Inventory i cache.
+# Tider er POSIX timestamps: NaN = ukendt, +inf slut = stadig i drift.
+INVENTORY_DTYPE = np.dtype([
+    ('network', 'U2'),
+    ('station', 'U5'),
+    ('channel', 'U3'),
+    ('latitude', 'f4'),
+    ('longitude', 'f4'),
+    ('elevation', 'f4'),
+    ('station_start', 'f8'),
+    ('start', 'f8'),
+    ('end', 'f8'),
+    ('sample_rate', 'f4'),
+])
+
+# Kompakt station tabel (én række per station) til sortering og udvælgelse.
+# Geografi og ankomsttider i float32, prioriteter i int8/int16. Tider forbliver
+# float64 (float32 har kun ~2 min opløsning på POSIX timestamps).
+# NaN = ukendt / ingen værdi.
+STATION_DTYPE = np.dtype([
+    ('network', 'U2'),
+    ('station', 'U5'),
+    ('channel_codes', 'U11'),
+    ('lat', 'f4'),
+    ('lon', 'f4'),
+    ('elev', 'f4'),
+    ('dist_km', 'f4'),
+    ('dist_deg', 'f4'),
+    ('azi', 'f4'),
+    ('p_sec', 'f4'),
+    ('s_sec', 'f4'),
+    ('surface_sec', 'f4'),
+    ('sample_rate', 'f4'),
+    ('channels', 'i2'),
+    ('net_prio', 'i1'),
+    ('chan_prio', 'i1'),
+    ('op_years', 'i2'),
+    ('channel_start', 'f8'),
+    ('channel_end', 'f8'),
+])
+
+# Analyse-klar stationer fra Europa (tættere på Danmark) - bruges hvis IRIS
+# søgning fejler. Sorteret efter breddegrad.
+FALLBACK_STATIONS = np.sort(np.array([
+    ('IU', 'KEV', 69.76, 27.01),      # Finland
+    ('II', 'BFO', 48.33, 8.33),       # Tyskland
+    ('GE', 'STU', 48.77, 9.19),       # Tyskland
+    ('DK', 'BSD', 55.11, 14.91),      # Bornholm
+    ('DK', 'COP', 55.68, 12.43),      # København
+    ('NS', 'BSEG', 62.20, 5.22),      # Norge
+    ('UP', 'UDD', 64.51, 21.04),      # Sverige
+], dtype=[('net', 'U2'), ('sta', 'U5'), ('lat', 'f8'), ('lon', 'f8')]), order='lat')
+
+def inventory_to_recarray(inventory):
+    """Flader ObsPy Inventory ud til et struktureret numpy array med én række per kanal"""
+    rows = []
+    for network in inventory:
+        for station in network:
+            station_start = station.start_date.timestamp if station.start_date else np.nan
+            elevation = station.elevation if station.elevation is not None else np.nan
+            for channel in station.channels:
+                rows.append((
+                    network.code,
+                    station.code,
+                    channel.code,
+                    station.latitude,
+                    station.longitude,
+                    elevation,
+                    station_start,
+                    channel.start_date.timestamp if channel.start_date else np.nan,
+                    channel.end_date.timestamp if channel.end_date else np.inf,
+                    channel.sample_rate if channel.sample_rate is not None else np.nan,
+                ))
+    return np.rec.array(rows, dtype=INVENTORY_DTYPE) if rows else np.recarray(0, dtype=INVENTORY_DTYPE)
+
+def station_records_to_dicts(records):
+    """
+    Konverterer rækker fra STATION_DTYPE tabellen til station dicts som
+    resten af appen bruger. Kaldes kun for de endeligt udvalgte stationer.
+    """
+    stations = []
+    for (network, station, channel_codes, lat, lon, elev, dist_km, dist_deg, azi,
+         p_sec, s_sec, surface_sec, sample_rate, channels, net_prio, chan_prio,
+         op_years, channel_start, channel_end) in records.tolist():
+        stations.append({
+            'network': network,
+            'station': station,
+            'latitude': round(lat, 4),
+            'longitude': round(lon, 4),
+            'elevation': round(elev, 1) if math.isfinite(elev) else None,
+            'distance_km': round(dist_km, 1),
+            'distance_deg': round(dist_deg, 2),
+            'azimuth': round(azi, 1),
+            
+            # VIGTIG: Arrival times som SEKUNDER (float)!
+            'p_arrival': round(p_sec, 3) if math.isfinite(p_sec) and p_sec else None,
+            's_arrival': round(s_sec, 3) if math.isfinite(s_sec) and s_sec else None,
+            'surface_arrival': round(surface_sec, 3),
+            
+            # Metadata
+            'channels': channels,
+            'sample_rate': round(sample_rate, 3),
+            'channel_codes': channel_codes,
+            'network_priority': net_prio,
+            'channel_priority': chan_prio,
+            'operational_years': op_years,
+            # channel_end = None betyder at kanalen stadig er i drift
+            'channel_start': channel_start if math.isfinite(channel_start) else None,
+            'channel_end': channel_end if math.isfinite(channel_end) else None,
+            'data_verified': None  # Will be set during validation
+        })
+    return stations
+
+@st.cache_resource(show_spinner=False, ttl=STATION_INDEX_TTL_S)
+def get_station_index(_client):
+    """
+    Henter station-niveau inventory for alle IRIS stationer (højst én gang i
+    døgnet per proces) og returnerer koordinater og driftsperioder som numpy arrays.
+    Bruges til lokale radius opslag i stedet for IRIS radius søgning.
+    """
+    logger.info("Building global station index...")
+    # Egen kopi med længere timeout - den delte client ændres ikke
+    index_client = copy.copy(_client)
+    index_client.timeout = STATION_INDEX_TIMEOUT_S
+    inventory = index_client.get_stations(
+        channel=",".join(STATION_CHANNELS),
+        level="station",
+        includerestricted=False
+    )
+    
+    networks, stations, lats, lons, starts, ends = [], [], [], [], [], []
+    for network in inventory:
+        for station in network:
+            networks.append(network.code)
+            stations.append(station.code)
+            lats.append(station.latitude)
+            lons.append(station.longitude)
+            starts.append(station.start_date.timestamp if station.start_date else -np.inf)
+            ends.append(station.end_date.timestamp if station.end_date else np.inf)
+    
+    logger.info("Station index built with %d station epochs", len(stations))
+    return {
+        'network': np.array(networks),
+        'station': np.array(stations),
+        'lat_rad': np.radians(np.array(lats, dtype=np.float64)),
+        'lon_rad': np.radians(np.array(lons, dtype=np.float64)),
+        'start': np.array(starts, dtype=np.float64),
+        'end': np.array(ends, dtype=np.float64),
+        'network_priority': np.array([NETWORK_SCORES.get(n, 99) for n in networks], dtype=np.int16),
+    }
+
+@lru_cache(maxsize=64)
+def parse_station_xml(xml_bytes):
+    """Parser StationXML bytes til Inventory - samme bytes parses kun én gang"""
+    return read_inventory(BytesIO(xml_bytes), format='STATIONXML')
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(latitude, longitude, precision=4):
+    """
+    Geohash for en position. Precision 4 giver celler på ca. 40 x 20 km,
+    så nærliggende jordskælv deler cache nøgle.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True  # Længdegrad på lige bits
+    
+    while len(geohash) < precision:
+        if even_bit:
+            value, value_range = longitude, lon_range
+        else:
+            value, value_range = latitude, lat_range
+        
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+        
+        even_bit = not even_bit
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    
+    return ''.join(geohash)
+
+def cached_nbytes(value, depth=4):
+    """
+    Omtrentlig størrelse af array/bytes data i en cache. Går kun depth niveauer
+    ned i dicts, tuples og lists (cache -> (data, tid) -> waveform_data -> displacement_data).
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if depth <= 0:
+        return 0
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (tuple, list)):
+        return 0
+    return sum(cached_nbytes(item, depth - 1) for item in value)
+
+def haversine_km(lat1_rad, lon1_rad, lats_rad, lons_rad):
+    """Storcirkel afstand i km fra ét punkt til arrays af punkter (radianer)"""
+    if NUMEXPR_AVAILABLE:
+        # Én fusioneret gennemløb uden mellemliggende arrays
+        return ne.evaluate(
+            "2*R*arcsin(sqrt(sin((lat2-lat1)*0.5)**2 + cos(lat1)*cos(lat2)*sin((lon2-lon1)*0.5)**2))",
+            local_dict={
+                'R': EARTH_RADIUS_KM,
+                'lat1': lat1_rad, 'lon1': lon1_rad,
+                'lat2': lats_rad, 'lon2': lons_rad
+            }
+        )
+    
+    dlat = lats_rad - lat1_rad
+    dlon = lons_rad - lon1_rad
+    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat1_rad) * np.cos(lats_rad) * np.sin(dlon * 0.5) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def score_stations(lats, lons, eq_lat, eq_lon, min_distance_km, max_distance_km):
+    """
+    Vektoriseret afstand, azimuth og afstandsfilter for arrays af stationer.
+    
+    Returns:
+        tuple: (keep_idx, distance_km, azimuth) for stationer inden for intervallet
+    """
+    lat1 = np.radians(eq_lat)
+    lon1 = np.radians(eq_lon)
+    lats_rad = np.radians(lats, dtype=np.float64)
+    lons_rad = np.radians(lons, dtype=np.float64)
+    
+    distance_km = haversine_km(lat1, lon1, lats_rad, lons_rad)
+    
+    # Azimuth fra jordskælv til station (grader fra nord)
+    dlon = lons_rad - lon1
+    azimuth = np.degrees(np.arctan2(
+        np.sin(dlon) * np.cos(lats_rad),
+        np.cos(lat1) * np.sin(lats_rad) - np.sin(lat1) * np.cos(lats_rad) * np.cos(dlon)
+    )) % 360.0
+    
+    keep_idx = np.flatnonzero((distance_km >= min_distance_km) & (distance_km <= max_distance_km))
+    return keep_idx, distance_km[keep_idx], azimuth[keep_idx]
+
+@lru_cache(maxsize=1024)
+def _parse_iso(time_str):
+    """Parser tidsstreng én gang - samme jordskælvstid slås op mange gange"""
+    return UTCDateTime(time_str)
 
 def ensure_utc_datetime(time_obj):
     """Konverterer forskellige tidsformater til UTCDateTime"""
@@ -54,11 +422,8 @@ def ensure_utc_datetime(time_obj):
         return time_obj
     
     if isinstance(time_obj, str):
-        # Håndter ISO format
-        if 'T' in time_obj:
-            return UTCDateTime(time_obj)
-        # Håndter andre string formater
-        return UTCDateTime(time_obj)
+        # ISO og andre string formater - cached parse
+        return _parse_iso(time_obj)
     
     if isinstance(time_obj, (int, float)):
         return UTCDateTime(time_obj)
@@ -82,6 +447,9 @@ class StreamlinedDataManager:
     
     def __init__(self):
         """Initialiserer data manager med cached komponenter"""
+        # HTTP session til lette FDSN kald (pooled forbindelser + retries)
+        self.http_session = create_http_session()
+        
         # IRIS client
         self.client = None
         self.connect_to_iris()
@@ -101,37 +469,29 @@ class StreamlinedDataManager:
             st.session_state.waveform_cache = {}
         if 'inventory_cache' not in st.session_state:
             st.session_state.inventory_cache = {}
+        if 'response_cache' not in st.session_state:
+            st.session_state.response_cache = {}
     
     # ========================================
     # IRIS CONNECTION
     # ========================================
     
     def connect_to_iris(self):
-        """Opretter forbindelse til IRIS med retries"""
-        max_retries = 3
-        retry_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"Connecting to IRIS... (attempt {attempt + 1}/{max_retries})")
-                self.client = Client("IRIS", timeout=30)
-                # Test forbindelse
-                test_time = UTCDateTime.now()
-                self.client.get_stations(
-                    network="IU", station="ANMO", 
-                    starttime=test_time - 86400,
-                    endtime=test_time,
-                    level="station"
-                )
-                print("✓ IRIS connection established")
-                return True
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                else:
-                    st.error(f"Kunne ikke oprette forbindelse til IRIS: {str(e)}")
-                    return False
-        return False
+        """Opretter forbindelse til IRIS. Retries håndteres af HTTP session."""
+        try:
+            print("Connecting to IRIS...")
+            self.client = get_iris_client()
+            # Test forbindelse
+            response = self.http_session.get(
+                f"{self.client.base_url}/{self.client.url_subpath}/station/1/version",
+                timeout=30
+            )
+            response.raise_for_status()
+            print("✓ IRIS connection established")
+            return True
+        except Exception as e:
+            st.error(f"Kunne ikke oprette forbindelse til IRIS: {str(e)}")
+            return False
     
     # ========================================
     # EARTHQUAKE SEARCH
@@ -166,7 +526,7 @@ class StreamlinedDataManager:
                   f"depth {depth_range[0]}-{depth_range[1]} km")
             
             # VIGTIG: Brug dybde i KILOMETER
-            catalog = self.client.get_events(
+            earthquakes = self._fetch_events(
                 starttime=starttime,
                 endtime=endtime,
                 minmagnitude=magnitude_range[0],
@@ -177,8 +537,6 @@ class StreamlinedDataManager:
                 limit=limit
             )
             
-            earthquakes = self._process_catalog(catalog)
-            
             # Update cache
             if earthquakes:
                 self._update_cache('earthquake_cache', cache_key, earthquakes)
@@ -198,48 +556,96 @@ class StreamlinedDataManager:
             limit=20
         )
     
-    def _process_catalog(self, catalog):
+    def _fetch_events(self, **kwargs):
         """
-        Process ObsPy catalog til list af dictionaries.
-        VIGTIG: Returnerer ISO timestamp strings, IKKE obspy_event!
+        Henter events fra IRIS som rå QuakeML og parser kun de felter vi bruger.
+        Undgår at ObsPy bygger hele Catalog objektet (picks, amplitudes, osv.).
         """
-        earthquakes = []
-        
-        # Sortér catalog efter tid (nyeste først) siden IRIS kun giver "time" (ældste først)
-        sorted_events = sorted(catalog, key=lambda e: e.preferred_origin().time, reverse=True)
-        
-        for event in sorted_events:
+        buffer = BytesIO()
+        self.client.get_events(filename=buffer, **kwargs)
+        buffer.seek(0)
+        return self._parse_quakeml_events(buffer)
+    
+    def _parse_quakeml_events(self, source):
+        """
+        Streaming parse af QuakeML til list af dictionaries.
+        Hvert <event> element ryddes efter brug så hukommelsen holdes lav.
+        """
+        rows = []
+        for _, elem in ET.iterparse(source, events=('end',)):
+            if not elem.tag.endswith('}event'):
+                continue
+            
+            ns = elem.tag[:-len('event')]
             try:
                 # Få preferred origin og magnitude
-                origin = event.preferred_origin() or event.origins[0]
-                magnitude = event.preferred_magnitude() or event.magnitudes[0]
-                
-                # Lokation beskrivelse
-                if event.event_descriptions:
-                    location = event.event_descriptions[0].text
-                else:
-                    location = f"Lat: {origin.latitude:.2f}, Lon: {origin.longitude:.2f}"
-                
-                eq_dict = {
-                    'time': origin.time.isoformat(),  # ISO string format!
-                    'latitude': float(origin.latitude),
-                    'longitude': float(origin.longitude),
-                    'depth': float(origin.depth / 1000.0) if origin.depth else 10.0,  # Til km
-                    'magnitude': float(magnitude.mag),
-                    'magnitude_type': str(magnitude.magnitude_type) if magnitude.magnitude_type else 'M',
-                    'location': location,
-                    'event_id': str(event.resource_id).split('/')[-1]
-                }
-                
-                # IKKE inkluderet: 'obspy_event' - dette forårsager problemer!
-                
-                earthquakes.append(eq_dict)
+                origins = elem.findall(f'{ns}origin')
+                magnitudes = elem.findall(f'{ns}magnitude')
+                preferred_origin_id = elem.findtext(f'{ns}preferredOriginID')
+                preferred_magnitude_id = elem.findtext(f'{ns}preferredMagnitudeID')
+                origin = next((o for o in origins if o.get('publicID') == preferred_origin_id), origins[0])
+                magnitude = next((m for m in magnitudes if m.get('publicID') == preferred_magnitude_id), magnitudes[0])
                 
+                rows.append((
+                    origin.findtext(f'{ns}time/{ns}value'),
+                    origin.findtext(f'{ns}latitude/{ns}value'),
+                    origin.findtext(f'{ns}longitude/{ns}value'),
+                    origin.findtext(f'{ns}depth/{ns}value'),
+                    magnitude.findtext(f'{ns}mag/{ns}value'),
+                    magnitude.findtext(f'{ns}type'),
+                    elem.findtext(f'{ns}description/{ns}text'),
+                    elem.get('publicID', '')
+                ))
             except Exception as e:
                 print(f"Error processing event: {e}")
-                continue
+            finally:
+                elem.clear()
+        
+        if not rows:
+            return []
+        
+        df = pd.DataFrame(rows, columns=EVENT_COLUMNS)
+        df['time'] = pd.to_datetime(df['time'], utc=True, format='ISO8601', errors='coerce')
+        return self._build_earthquake_records(df)
+    
+    def _build_earthquake_records(self, df):
+        """
+        Konverterer rå event kolonner (se EVENT_COLUMNS) kolonnevis
+        til list af earthquake dictionaries med ISO timestamp strings.
+        """
+        for col in ('latitude', 'longitude', 'depth_m', 'magnitude'):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.dropna(subset=['time', 'latitude', 'longitude', 'magnitude'])
+        
+        # Sortér efter tid (nyeste først) siden IRIS kun giver "time" (ældste først)
+        df = df.sort_values('time', ascending=False, kind='stable')
+        
+        # ISO string format!
+        df['time'] = df['time'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        
+        # Til km - manglende eller 0 dybde bliver 10 km
+        depth_m = df['depth_m']
+        df['depth'] = np.where(depth_m.notna() & (depth_m != 0), depth_m / 1000.0, 10.0)
+        
+        df['magnitude_type'] = df['magnitude_type'].where(
+            df['magnitude_type'].notna() & (df['magnitude_type'] != ''), 'M'
+        ).astype(str)
+        
+        # Lokation beskrivelse
+        fallback_location = (
+            'Lat: ' + df['latitude'].map('{:.2f}'.format) +
+            ', Lon: ' + df['longitude'].map('{:.2f}'.format)
+        )
+        df['location'] = df['location'].where(df['location'].notna(), fallback_location)
+        
+        df['event_id'] = df['resource_id'].str.rsplit('/', n=1).str[-1]
+        
+        # IKKE inkluderet: 'obspy_event' - dette forårsager problemer!
         
-        return earthquakes
+        return df[[
+            'time', 'latitude', 'longitude', 'depth', 'magnitude',
+            'magnitude_type', 'location', 'event_id'
+        ]].to_dict(orient='records')
     
     # ========================================
     # STATION SEARCH - ORIGINAL V1.7 IMPLEMENTATION
@@ -281,24 +687,17 @@ class StreamlinedDataManager:
             progress_bar.progress(0.1)
             status_text.text("🔍 Søger stationer i IRIS database...")
             
-            # Check cache først
-            cache_key = f"{eq_lat:.2f},{eq_lon:.2f},{min_distance_km},{max_distance_km}"
+            # Check cache først - geohash celle så nærliggende jordskælv samme dag deler
+            # inventory (kanalerne hentes kun for eq_time ±1 dag)
+            cache_key = (f"{geohash_encode(eq_lat, eq_lon, precision=4)}_{eq_time.date}_"
+                         f"{min_distance_km}_{max_distance_km}")
             inventory = st.session_state.get('inventory_cache', {}).get(cache_key)
             
-            if not inventory:
-                # Søg stationer inden for radius
-                inventory = self.client.get_stations(
-                    latitude=eq_lat,
-                    longitude=eq_lon,
-                    minradius=kilometers2degrees(min_distance_km),
-                    maxradius=kilometers2degrees(max_distance_km),
-                    channel="BH?,HH?,SH?,EH?",
-                    level="channel",
-                    starttime=eq_time - 86400,
-                    endtime=eq_time + 86400,
-                    includerestricted=False,
-                    matchtimeseries=False
-                )
+            if inventory is None:
+                # Gem kun kompakt kanal-tabel - ikke hele ObsPy Inventory
+                inventory = inventory_to_recarray(self._fetch_candidate_inventory(
+                    eq_lat, eq_lon, eq_time, min_distance_km, max_distance_km
+                ))
                 
                 # Cache kun for mindre søgninger
                 if max_distance_km <= 3000:
@@ -313,7 +712,7 @@ class StreamlinedDataManager:
                 min_distance_km, max_distance_km
             )
             
-            if not all_stations:
+            if len(all_stations) == 0:
                 progress_placeholder.warning("⚠️ Ingen stationer fundet")
                 return self._fallback_station_list_optimized(
                     earthquake, min_distance_km, max_distance_km, target_stations
@@ -323,12 +722,12 @@ class StreamlinedDataManager:
             progress_bar.progress(0.5)
             status_text.text(f"🎯 Udvælger optimalt fordelte stationer fra {len(all_stations)} kandidater...")
             
-            # Sorter efter kvalitet og afstand
-            all_stations.sort(key=lambda x: (
-                x.get('network_priority', 99),
-                x.get('channel_priority', 99),
-                -x.get('operational_years', 0),
-                x['distance_km']
+            # Sorter efter kvalitet og afstand direkte på tabellen (sidste nøgle er primær i lexsort)
+            order = np.lexsort((
+                all_stations['dist_km'],
+                -all_stations['op_years'],
+                all_stations['chan_prio'],
+                all_stations['net_prio']
             ))
             
             # ADAPTIV kandidat udvælgelse
@@ -340,7 +739,8 @@ class StreamlinedDataManager:
                 # Færre stationer - tag flere kandidater  
                 candidates_count = min(len(all_stations), target_stations * 5)
             
-            candidates = all_stations[:candidates_count]
+            # Kun de udvalgte rækker konverteres til dicts
+            candidates = station_records_to_dicts(all_stations[order[:candidates_count]])
             
             # Geografisk fordeling
             selected_stations = self._select_distributed_stations(candidates, target_stations * 2)
@@ -400,121 +800,177 @@ class StreamlinedDataManager:
                 progress_placeholder.error(f"Fejl ved stationssøgning: {str(e)}")
             return []
     
+    def _fetch_candidate_inventory(self, eq_lat, eq_lon, eq_time,
+                                   min_distance_km, max_distance_km):
+        """
+        Henter kanal-niveau inventory for stationer inden for afstandsintervallet.
+        
+        Kandidater findes lokalt i det globale station index, og kanal-metadata
+        hentes kun for de bedste kandidater. Falder tilbage til IRIS radius
+        søgning hvis index ikke er tilgængeligt.
+        """
+        # Fejlede index download caches ikke af st.cache_resource - husk fejlen
+        # i sessionen så hver søgning ikke venter på en ny timeout
+        index = None
+        failed_at = st.session_state.get('station_index_failed_at')
+        if failed_at is None or time.time() - failed_at > STATION_INDEX_RETRY_S:
+            try:
+                index = get_station_index(self.client)
+            except Exception as e:
+                st.session_state['station_index_failed_at'] = time.time()
+                logger.warning("Station index download failed, using IRIS radius search: %s", e)
+        
+        if index is not None:
+            try:
+                distances = haversine_km(
+                    np.radians(eq_lat), np.radians(eq_lon),
+                    index['lat_rad'], index['lon_rad']
+                )
+                eq_timestamp = eq_time.timestamp
+                # 1% margin for sfære vs. ellipsoide - præcis afstand beregnes senere
+                candidate_idx = np.flatnonzero(
+                    (distances >= min_distance_km * 0.99) & (distances <= max_distance_km * 1.01) &
+                    (index['start'] <= eq_timestamp) & (eq_timestamp <= index['end'])
+                )
+                
+                # Bedste netværk først, derefter afstand
+                order = np.lexsort((distances[candidate_idx], index['network_priority'][candidate_idx]))
+                candidate_idx = candidate_idx[order]
+                
+                # Dedupliker station epoker og begræns antal
+                candidates = list(dict.fromkeys(
+                    zip(index['network'][candidate_idx], index['station'][candidate_idx])
+                ))[:INDEX_CANDIDATE_LIMIT]
+                
+                if candidates:
+                    bulk = [
+                        (str(net), str(sta), '*', channels, eq_time - 86400, eq_time + 86400)
+                        for net, sta in candidates
+                        for channels in STATION_CHANNELS
+                    ]
+                    return self.client.get_stations_bulk(
+                        bulk, level="channel", includerestricted=False
+                    )
+            except Exception as e:
+                logger.warning("Station index lookup failed, using IRIS radius search: %s", e)
+        
+        # Søg stationer inden for radius
+        return self.client.get_stations(
+            latitude=eq_lat,
+            longitude=eq_lon,
+            minradius=kilometers2degrees(min_distance_km),
+            maxradius=kilometers2degrees(max_distance_km),
+            channel=",".join(STATION_CHANNELS),
+            level="channel",
+            starttime=eq_time - 86400,
+            endtime=eq_time + 86400,
+            includerestricted=False,
+            matchtimeseries=False
+        )
+    
     def _process_inventory_to_stations(self, inventory, eq_lat, eq_lon, eq_depth, eq_time,
                                       min_distance_km, max_distance_km):
         """
-        Helper metode til at processere ObsPy inventory til station liste.
-        VIGTIG: Returnerer arrival times som SEKUNDER (float) ikke UTCDateTime!
+        Helper metode til at processere kanal-tabel (se inventory_to_recarray)
+        til kompakt station tabel (STATION_DTYPE).
+        VIGTIG: Arrival times er SEKUNDER (float) ikke UTCDateTime!
+        Brug station_records_to_dicts til de endeligt udvalgte rækker.
         """
-        stations = []
+        if len(inventory) == 0:
+            return np.recarray(0, dtype=STATION_DTYPE)
+        
+        # Kanal prioritet per række (0 = ikke brugbar kanal)
+        priorities = np.array([
+            CHANNEL_BUCKETS.get(code[:2], OTHER_CHANNEL_PRIORITY if code[1:2] == 'H' else 0)
+            for code in inventory['channel']
+        ], dtype=np.int16)
+        
+        # Rækker er grupperet per station - find gruppegrænser
+        networks = inventory['network']
+        station_codes = inventory['station']
+        boundaries = np.flatnonzero(
+            (networks[1:] != networks[:-1]) | (station_codes[1:] != station_codes[:-1])
+        ) + 1
+        group_starts = np.concatenate(([0], boundaries))
+        group_ends = np.append(boundaries, len(inventory))
+        
+        # Afstand, azimuth og afstandsfilter for alle stationer på én gang
+        keep_idx, distances_km, azimuths = score_stations(
+            inventory['latitude'][group_starts], inventory['longitude'][group_starts],
+            eq_lat, eq_lon, min_distance_km, max_distance_km
+        )
+        distances_deg = kilometers2degrees(distances_km)
         
-        # Prioriterede netværk scoring
-        network_scores = {
-            'IU': 1, 'II': 0,  # GSN - højeste prioritet
-            'G': 2, 'GE': 2,   # GEOSCOPE/GEOFON
-            'GT': 3, 'US': 4, 'CN': 4,  # Andre høj-kvalitet
-        }
+        stations = np.recarray(len(keep_idx), dtype=STATION_DTYPE)
+        count = 0
         
-        for network in inventory:
-            for station in network:
+        for first, last, distance_km, distance_deg, azimuth in zip(
+                group_starts[keep_idx], group_ends[keep_idx],
+                distances_km.tolist(), distances_deg.tolist(), azimuths.tolist()):
+            network_code = str(networks[first])
+            station_code = str(station_codes[first])
+            try:
+                group_priorities = priorities[first:last]
+                usable = group_priorities > 0
+                if not usable.any():
+                    continue
+                
+                # Vælg bedste kanal type
+                channel_priority = int(group_priorities[usable].min())
+                selected = inventory[first:last][group_priorities == channel_priority]
+                first_rate = selected['sample_rate'][0]
+                typical_rate = TYPICAL_SAMPLE_RATES.get(
+                    channel_priority, float(first_rate) if np.isfinite(first_rate) and first_rate else 20
+                )
+                
+                # Kanalernes driftsvindue - bruges til validering uden HTTP probe.
+                # NaN slut betyder at kanalen stadig er i drift.
+                starts = selected['start']
+                ends = selected['end']
+                channel_start = starts.min() if not np.isnan(starts).any() else np.nan
+                channel_end = ends.max() if np.isfinite(ends).all() else np.nan
+                
+                # Beregn arrival times med TauP - SEKUNDER!
+                # Afrundet dybde/afstand så nærliggende stationer deler resultat
                 try:
-                    # Tjek channels og find bedste type
-                    hh_channels = []
-                    bh_channels = []
-                    other_channels = []
-                    
-                    for channel in station.channels:
-                        if channel.code.startswith('HH'):
-                            hh_channels.append(channel)
-                        elif channel.code.startswith('BH'):
-                            bh_channels.append(channel)
-                        elif channel.code[1] == 'H':  # ?H?
-                            other_channels.append(channel)
-                    
-                    # Vælg bedste kanal type
-                    if hh_channels:
-                        selected_channels = hh_channels
-                        channel_priority = 1
-                        typical_rate = 100
-                    elif bh_channels:
-                        selected_channels = bh_channels
-                        channel_priority = 2
-                        typical_rate = 40
-                    elif other_channels:
-                        selected_channels = other_channels
-                        channel_priority = 3
-                        typical_rate = selected_channels[0].sample_rate if selected_channels else 20
-                    else:
-                        continue
-                    
-                    # Beregn distance og azimuth
-                    distance_m, azimuth, _ = gps2dist_azimuth(
-                        eq_lat, eq_lon, station.latitude, station.longitude
+                    p_arrival_seconds, s_arrival_seconds = taup_p_s_times(
+                        round(eq_depth), round(distance_deg, 2)
                     )
-                    distance_km = distance_m / 1000.0
-                    distance_deg = kilometers2degrees(distance_km)
-                    
-                    # Skip hvis uden for range
-                    if distance_km < min_distance_km or distance_km > max_distance_km:
-                        continue
-                    
-                    # Beregn arrival times med TauP - RETURNÉR SOM SEKUNDER!
-                    p_arrival_seconds = None
-                    s_arrival_seconds = None
-                    
-                    try:
-                        arrivals = self.taup_model.get_travel_times(
-                            source_depth_in_km=eq_depth,
-                            distance_in_degree=distance_deg,
-                            phase_list=["P", "S"]
-                        )
-                        
-                        for arrival in arrivals:
-                            if arrival.phase.name == "P" and p_arrival_seconds is None:
-                                p_arrival_seconds = arrival.time  # Dette er allerede i sekunder!
-                            elif arrival.phase.name == "S" and s_arrival_seconds is None:
-                                s_arrival_seconds = arrival.time  # Dette er allerede i sekunder!
-                    except:
-                        # Fallback beregning
-                        p_arrival_seconds = distance_km / 8.0  # ~8 km/s for P-waves
-                        s_arrival_seconds = distance_km / 4.5  # ~4.5 km/s for S-waves
-                    
-                    # Beregn overfladebølge ankomst
-                    surface_arrival_seconds = distance_km / 3.5  # ~3.5 km/s
-                    
-                    # Station info
-                    station_info = {
-                        'network': network.code,
-                        'station': station.code,
-                        'latitude': station.latitude,
-                        'longitude': station.longitude,
-                        'elevation': station.elevation,
-                        'distance_km': round(distance_km, 1),
-                        'distance_deg': round(distance_deg, 2),
-                        'azimuth': round(azimuth, 1),
-                        
-                        # VIGTIG: Arrival times som SEKUNDER (float)!
-                        'p_arrival': round(p_arrival_seconds, 3) if p_arrival_seconds else None,
-                        's_arrival': round(s_arrival_seconds, 3) if s_arrival_seconds else None,
-                        'surface_arrival': round(surface_arrival_seconds, 3),
-                        
-                        # Metadata
-                        'channels': len(selected_channels),
-                        'sample_rate': typical_rate,
-                        'channel_codes': ','.join([ch.code for ch in selected_channels[:3]]),
-                        'network_priority': network_scores.get(network.code, 99),
-                        'channel_priority': channel_priority,
-                        'operational_years': (eq_time.year - station.start_date.year) if station.start_date else 0,
-                        'data_verified': None  # Will be set during validation
-                    }
-                    
-                    stations.append(station_info)
-                    
-                except Exception as e:
-                    print(f"Error processing station {network.code}.{station.code}: {e}")
-                    continue
+                except:
+                    # Fallback beregning
+                    p_arrival_seconds = distance_km / 8.0  # ~8 km/s for P-waves
+                    s_arrival_seconds = distance_km / 4.5  # ~4.5 km/s for S-waves
+                
+                station_start = inventory['station_start'][first]
+                
+                stations[count] = (
+                    network_code,
+                    station_code,
+                    ','.join(selected['channel'][:3].tolist()),
+                    inventory['latitude'][first],
+                    inventory['longitude'][first],
+                    inventory['elevation'][first],
+                    distance_km,
+                    distance_deg,
+                    azimuth,
+                    p_arrival_seconds,
+                    s_arrival_seconds,
+                    distance_km / 3.5,  # Overfladebølge ~3.5 km/s
+                    typical_rate,
+                    len(selected),
+                    NETWORK_SCORES.get(network_code, 99),
+                    channel_priority,
+                    (eq_time.year - UTCDateTime(station_start).year) if np.isfinite(station_start) else 0,
+                    channel_start,
+                    channel_end,
+                )
+                count += 1
+                
+            except Exception as e:
+                print(f"Error processing station {network_code}.{station_code}: {e}")
+                continue
         
-        return stations
+        return stations[:count]
     
     def _select_distributed_stations(self, stations, target_count):
         """
@@ -630,13 +1086,44 @@ class StreamlinedDataManager:
     def _validate_stations_parallel(self, stations, eq_time, target_count, 
                                    progress_bar, status_text):
         """
-        OPTIMERET parallel validering med tidlig stop fra v1.7
+        OPTIMERET validering med tidlig stop fra v1.7.
         Checker kun data tilgængelighed, IKKE response requirement!
+        
+        Inventory metadata (kanalernes start/slut dato) afgør tilgængelighed
+        i hukommelsen. Kun stationer uden metadata vindue probes via IRIS.
         """
         validated = []
         verified_count = 0
         lock = threading.Lock()
         
+        # TRIN 1: Metadata check - ingen netværkskald
+        eq_timestamp = eq_time.timestamp
+        to_probe = []
+        for station in stations:
+            channel_start = station.get('channel_start')
+            if channel_start is None:
+                # Tvetydig metadata - kræver probe
+                to_probe.append(station)
+                continue
+            
+            channel_end = station.get('channel_end')
+            station['data_verified'] = (
+                channel_start <= eq_timestamp and
+                (channel_end is None or eq_timestamp <= channel_end)
+            )
+            validated.append(station)
+            if station['data_verified']:
+                verified_count += 1
+        
+        if validated:
+            progress = min(0.7 + (0.2 * len(validated) / len(stations)), 0.9)
+            progress_bar.progress(progress)
+            status_text.text(
+                f"✓ Verificeret {verified_count} af {len(validated)} stationer..."
+            )
+        
+        dataselect_url = f"{self.client.base_url}/{self.client.url_subpath}/dataselect/1/query"
+        
         # Funktion til at validere en enkelt station
         def validate_single(station):
             try:
@@ -649,20 +1136,25 @@ class StreamlinedDataManager:
                 # Prøv kun HH eller BH kanaler først
                 for channels in ["HH?", "BH?"]:
                     try:
-                        # VIGTIGT: Dette er kun en TEST - ikke den faktiske data!
-                        test_stream = self.client.get_waveforms(
-                            network=station['network'],
-                            station=station['station'],
-                            location='*',
-                            channel=channels,
-                            starttime=start_time,
-                            endtime=end_time
-                        )
-                        
-                        if test_stream and len(test_stream) > 0:
-                            station['data_verified'] = True
-                            station['verified_channels'] = channels
-                            return station
+                        # VIGTIGT: Kun HTTP status læses - data downloades og parses ikke
+                        with self.http_session.get(
+                            dataselect_url,
+                            params={
+                                'net': station['network'],
+                                'sta': station['station'],
+                                'loc': '*',
+                                'cha': channels,
+                                'start': start_time.format_iris_web_service(),
+                                'end': end_time.format_iris_web_service(),
+                                'nodata': 404
+                            },
+                            timeout=10,
+                            stream=True
+                        ) as response:
+                            if response.status_code == 200:
+                                station['data_verified'] = True
+                                station['verified_channels'] = channels
+                                return station
                     except:
                         continue
                 
@@ -675,32 +1167,49 @@ class StreamlinedDataManager:
                 station['error'] = str(e)
                 return station
         
-        # Parallel execution med early termination
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = {executor.submit(validate_single, station): station 
-                      for station in stations}
-            
-            for future in as_completed(futures):
-                if verified_count >= target_count * 2:
-                    # Har nok verificerede, stop
-                    break
+        # TRIN 2: Parallel probe kun for stationer uden metadata vindue
+        if to_probe and verified_count < target_count * 2:
+            # Eksplicit executor så resterende probes kan annulleres ved tidlig stop
+            executor = ThreadPoolExecutor(max_workers=6)
+            last_update = 0.0
+            try:
+                futures = {executor.submit(validate_single, station): station 
+                          for station in to_probe}
                 
-                try:
-                    result = future.result(timeout=5)
+                for future in as_completed(futures):
+                    if verified_count >= target_count * 2:
+                        # Har nok verificerede - annuller resten og stop
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
                     
-                    with lock:
-                        validated.append(result)
-                        if result.get('data_verified', False):
-                            verified_count += 1
+                    try:
+                        result = future.result(timeout=5)
                         
-                        # Update progress
-                        progress = min(0.7 + (0.2 * len(validated) / len(stations)), 0.9)
-                        progress_bar.progress(progress)
-                        status_text.text(
-                            f"✓ Verificeret {verified_count} af {len(validated)} stationer..."
-                        )
-                except:
-                    pass
+                        with lock:
+                            validated.append(result)
+                            if result.get('data_verified', False):
+                                verified_count += 1
+                        
+                        # Update progress - højst hvert 0.2 sekund (hvert kald er en websocket besked)
+                        now = time.time()
+                        if now - last_update > 0.2:
+                            last_update = now
+                            progress = min(0.7 + (0.2 * len(validated) / len(stations)), 0.9)
+                            progress_bar.progress(progress)
+                            status_text.text(
+                                f"✓ Verificeret {verified_count} af {len(validated)} stationer..."
+                            )
+                    except:
+                        pass
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            # Afsluttende progress opdatering
+            progress = min(0.7 + (0.2 * len(validated) / len(stations)), 0.9)
+            progress_bar.progress(progress)
+            status_text.text(
+                f"✓ Verificeret {verified_count} af {len(validated)} stationer..."
+            )
         
         # Sorter: verificerede først
         validated.sort(key=lambda x: (not x.get('data_verified', False), x['distance_km']))
@@ -713,58 +1222,45 @@ class StreamlinedDataManager:
         """
         eq_lat = earthquake.get('latitude', 0)
         eq_lon = earthquake.get('longitude', 0)
-        eq_depth = earthquake.get('depth', 10)
         
-        # Analyse-klar stationer fra Europa (tættere på Danmark)
-        analysis_ready_stations = [
-            {'net': 'IU', 'sta': 'KEV', 'lat': 69.76, 'lon': 27.01},      # Finland
-            {'net': 'II', 'sta': 'BFO', 'lat': 48.33, 'lon': 8.33},       # Tyskland  
-            {'net': 'GE', 'sta': 'STU', 'lat': 48.77, 'lon': 9.19},       # Tyskland
-            {'net': 'DK', 'sta': 'BSD', 'lat': 55.11, 'lon': 14.91},      # Bornholm
-            {'net': 'DK', 'sta': 'COP', 'lat': 55.68, 'lon': 12.43},      # København
-            {'net': 'NS', 'sta': 'BSEG', 'lat': 62.20, 'lon': 5.22},      # Norge
-            {'net': 'UP', 'sta': 'UDD', 'lat': 64.51, 'lon': 21.04},      # Sverige
-        ]
+        # Vektoriseret afstandsfilter over den faste station tabel
+        keep_idx, distances_km, azimuths = score_stations(
+            FALLBACK_STATIONS['lat'], FALLBACK_STATIONS['lon'],
+            eq_lat, eq_lon, min_distance_km, max_distance_km
+        )
         
-        stations = []
-        for sta_data in analysis_ready_stations:
-            try:
-                # Beregn afstand til jordskælv
-                distance_m, azimuth, _ = gps2dist_azimuth(
-                    eq_lat, eq_lon, sta_data['lat'], sta_data['lon']
-                )
-                distance_km = distance_m / 1000.0
-                distance_deg = kilometers2degrees(distance_km)
-                
-                # Kontroller om i ønsket afstands range
-                if min_distance_km <= distance_km <= max_distance_km:
-                    # Beregn ankomsttider som SEKUNDER
-                    p_arrival = distance_km / 8.0  # ~8 km/s
-                    s_arrival = distance_km / 4.5  # ~4.5 km/s
-                    surface_arrival = distance_km / 3.5  # ~3.5 km/s
-                    
-                    # Opret station dictionary
-                    station = {
-                        'network': sta_data['net'],
-                        'station': sta_data['sta'],
-                        'latitude': sta_data['lat'],
-                        'longitude': sta_data['lon'],
-                        'distance_deg': round(distance_deg, 2),
-                        'distance_km': round(distance_km, 1),
-                        'azimuth': round(azimuth, 1),
-                        'p_arrival': round(p_arrival, 3),
-                        's_arrival': round(s_arrival, 3),
-                        'surface_arrival': round(surface_arrival, 3),
-                        'data_source': 'ANALYSIS_READY_FALLBACK',
-                        'data_verified': None
-                    }
-                    stations.append(station)
-            except:
-                continue
+        # Sortér efter afstand - kun de returnerede rækker beregnes videre
+        order = np.argsort(distances_km, kind='stable')[:target_stations]
+        selected = FALLBACK_STATIONS[keep_idx[order]]
+        distances_km = distances_km[order]
+        
+        # Ankomsttider som SEKUNDER - vektoriseret for alle valgte stationer
+        distance_deg = np.round(kilometers2degrees(distances_km), 2)
+        p_arrival = np.round(distances_km / 8.0, 3)        # ~8 km/s
+        s_arrival = np.round(distances_km / 4.5, 3)        # ~4.5 km/s
+        surface_arrival = np.round(distances_km / 3.5, 3)  # ~3.5 km/s
         
-        # Sortér efter afstand og returner
-        stations.sort(key=lambda x: x['distance_km'])
-        return stations[:target_stations]
+        return [
+            {
+                'network': net,
+                'station': sta,
+                'latitude': lat,
+                'longitude': lon,
+                'distance_deg': deg,
+                'distance_km': km,
+                'azimuth': azi,
+                'p_arrival': p,
+                's_arrival': s,
+                'surface_arrival': surface,
+                'data_source': 'ANALYSIS_READY_FALLBACK',
+                'data_verified': None
+            }
+            for (net, sta, lat, lon), deg, km, azi, p, s, surface in zip(
+                selected.tolist(), distance_deg.tolist(),
+                np.round(distances_km, 1).tolist(), np.round(azimuths[order], 1).tolist(),
+                p_arrival.tolist(), s_arrival.tolist(), surface_arrival.tolist()
+            )
+        ]
     
     # ========================================
     # WAVEFORM DOWNLOAD - PRAGMATISK APPROACH
@@ -786,48 +1282,29 @@ class StreamlinedDataManager:
             # Station info
             network = station['network']
             station_code = station['station']
-            distance_km = station.get('distance_km', 0)
-            
-            # Beregn tidsvindue
-            # Start: 2 minutter før P-wave
-            p_arrival_sec = station.get('p_arrival', distance_km / 8.0)
-            start_time = eq_time - 60  # 1 min før jordskælv
+            start_time, end_time = self._waveform_window(eq_time, station)
             
-            # Slut: Inkluder overfladebølger + buffer
-            surface_arrival_sec = station.get('surface_arrival', distance_km / 3.5)
-            total_duration = surface_arrival_sec + 600  # +10 min buffer
-            end_time = eq_time + total_duration
+            logger.debug("Downloading waveform for %s.%s", network, station_code)
+            logger.debug("Time window: %s to %s", start_time, end_time)
             
-            print(f"DEBUG: Downloading waveform for {network}.{station_code}")
-            print(f"DEBUG: Time window: {start_time} to {end_time}")
-            
-            # Download waveforms - prøv forskellige kanaler
+            # Download waveforms - alle kanal typer i ét FDSN kald,
+            # derefter vælges første type med data i prioriteret rækkefølge
             stream = None
-            tried_channels = []
-            
-            for channels in ["BH?", "HH?", "SH?", "EH?"]:
-                try:
-                    print(f"DEBUG: Trying channels {channels}")
-                    stream = self.client.get_waveforms(
-                        network=network,
-                        station=station_code,
-                        location='*',
-                        channel=channels,
-                        starttime=start_time,
-                        endtime=end_time
-                    )
-                    
-                    if stream and len(stream) > 0:
-                        print(f"DEBUG: Found {len(stream)} traces with channels {channels}")
-                        break
-                    else:
-                        tried_channels.append(channels)
-                except Exception as e:
-                    tried_channels.append(channels)
-                    continue
+            try:
+                logger.debug("Requesting channels %s", STATION_CHANNELS)
+                stream = self._select_preferred_channels(self.client.get_waveforms(
+                    network=network,
+                    station=station_code,
+                    location='*',
+                    channel=",".join(STATION_CHANNELS),
+                    starttime=start_time,
+                    endtime=end_time
+                ))
+            except Exception as e:
+                logger.debug("Waveform request failed: %s", e)
             
             if not stream or len(stream) == 0:
-                error_msg = f"Ingen data fundet. Prøvede kanaler: {', '.join(tried_channels)}"
+                error_msg = f"Ingen data fundet. Prøvede kanaler: {', '.join(STATION_CHANNELS)}"
                 st.error(error_msg)
                 return None
             
@@ -837,32 +1314,101 @@ class StreamlinedDataManager:
             )
             
             if waveform_data:
-                # Tilføj station metadata
-                waveform_data['station_info'] = station.copy()
-                
-                # Timing validering hvis processor er tilgængelig
-                if self.processor and hasattr(self.processor, 'validate_earthquake_timing'):
-                    try:
-                        is_valid, message, info = self.processor.validate_earthquake_timing(
-                            earthquake, station, waveform_data
-                        )
-                        waveform_data['timing_valid'] = is_valid
-                        waveform_data['timing_message'] = message
-                        if not is_valid:
-                            st.warning(f"⚠️ Timing validering: {message}")
-                    except Exception as e:
-                        print(f"DEBUG: Timing validation failed: {e}")
-                
-                return waveform_data
+                return self._finalize_waveform(waveform_data, earthquake, station)
             else:
                 return None
                 
         except Exception as e:
             st.error(f"Download fejl: {str(e)}")
-            print(f"DEBUG: Full error: {e}")
+            logger.debug("Full error: %s", e)
             import traceback
             traceback.print_exc()
             return None
+    
+    def download_waveforms_bulk(self, earthquake: Dict[str, Any],
+                                stations: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Download waveform data for flere stationer i ét get_waveforms_bulk kald.
+        
+        Returns:
+            list: waveform_data (eller None) i samme rækkefølge som stations
+        """
+        eq_time = ensure_utc_datetime(earthquake.get('time'))
+        if not eq_time or not stations:
+            return [None] * len(stations)
+        
+        windows = [self._waveform_window(eq_time, station) for station in stations]
+        bulk = [
+            (station['network'], station['station'], '*', ",".join(STATION_CHANNELS), start_time, end_time)
+            for station, (start_time, end_time) in zip(stations, windows)
+        ]
+        
+        try:
+            logger.debug("Bulk waveform request for %d stations", len(bulk))
+            all_traces = self.client.get_waveforms_bulk(bulk)
+        except Exception as e:
+            logger.debug("Bulk waveform request failed: %s", e)
+            return [None] * len(stations)
+        
+        results = []
+        for station, (start_time, end_time) in zip(stations, windows):
+            waveform_data = None
+            try:
+                stream = self._select_preferred_channels(
+                    all_traces.select(network=station['network'], station=station['station'])
+                )
+                if stream is not None:
+                    waveform_data = self._process_real_waveform_FIXED(
+                        stream, earthquake, station, start_time, end_time
+                    )
+                if waveform_data:
+                    waveform_data = self._finalize_waveform(waveform_data, earthquake, station)
+            except Exception as e:
+                logger.debug("Bulk processing failed for %s.%s: %s",
+                             station.get('network'), station.get('station'), e)
+                waveform_data = None
+            results.append(waveform_data)
+        
+        return results
+    
+    def _waveform_window(self, eq_time, station):
+        """Tidsvindue for download: 1 min før jordskælv til overfladebølger + 10 min"""
+        distance_km = station.get('distance_km', 0)
+        start_time = eq_time - 60  # 1 min før jordskælv
+        
+        # Slut: Inkluder overfladebølger + buffer
+        surface_arrival_sec = station.get('surface_arrival', distance_km / 3.5)
+        end_time = eq_time + surface_arrival_sec + 600  # +10 min buffer
+        return start_time, end_time
+    
+    def _select_preferred_channels(self, traces):
+        """Vælger første kanal type (STATION_CHANNELS rækkefølge) med data"""
+        for channels in STATION_CHANNELS:
+            selected = traces.select(channel=channels)
+            if len(selected) > 0:
+                logger.debug("Found %d traces with channels %s", len(selected), channels)
+                return selected
+        return None
+    
+    def _finalize_waveform(self, waveform_data, earthquake, station):
+        """Tilføjer station metadata og timing validering til processeret waveform"""
+        # Tilføj station metadata - reference, station dict læses kun videre
+        waveform_data['station_info'] = station
+        
+        # Timing validering hvis processor er tilgængelig
+        if self.processor and hasattr(self.processor, 'validate_earthquake_timing'):
+            try:
+                is_valid, message, info = self.processor.validate_earthquake_timing(
+                    earthquake, station, waveform_data
+                )
+                waveform_data['timing_valid'] = is_valid
+                waveform_data['timing_message'] = message
+                if not is_valid:
+                    st.warning(f"⚠️ Timing validering: {message}")
+            except Exception as e:
+                logger.debug("Timing validation failed: %s", e)
+        
+        return waveform_data
 
 
     def _process_real_waveform_FIXED(self, stream, earthquake, station, start_time, end_time):
@@ -872,67 +1418,63 @@ class StreamlinedDataManager:
         OPDATERET: INGEN downsampling - gem alt i fuld opløsning.
         """
         try:
-            print(f"DEBUG: Processing {len(stream)} traces")
+            logger.debug("Processing %d traces", len(stream))
+            
+            # Jordskælvstid én gang for hele funktionen
+            eq_time = ensure_utc_datetime(earthquake.get('time'))
             
-            # Kopier stream for at undgå at ændre original
-            work_stream = stream.copy()
+            # Kopier kun Stream containeren - trace data deles. Stream kommer
+            # direkte fra get_waveforms, og remove_response allokerer nye arrays.
+            work_stream = Stream(traces=stream.traces[:])
             
             # Pre-process: Merge
-            print("DEBUG: Merging stream...")
+            logger.debug("Merging stream...")
             work_stream.merge(method=1, fill_value=0)
-            print(f"DEBUG: After merge: {len(work_stream)} traces")
+            logger.debug("After merge: %d traces", len(work_stream))
             
             # VIGTIG: Check for og fjern duplicates efter merge
-            unique_channels = {}
+            # Tuple nøgler - ingen string formatering per trace
+            seen_ids = set()
+            unique_traces = []
             for tr in work_stream:
-                channel_id = f"{tr.stats.network}.{tr.stats.station}.{tr.stats.location}.{tr.stats.channel}"
-                if channel_id not in unique_channels:
-                    unique_channels[channel_id] = tr
-                else:
-                    print(f"DEBUG: Removing duplicate channel: {channel_id}")
+                stats = tr.stats
+                channel_id = (stats.network, stats.station, stats.location, stats.channel)
+                if channel_id in seen_ids:
+                    logger.debug("Removing duplicate channel: %s", '.'.join(channel_id))
+                    continue
+                seen_ids.add(channel_id)
+                unique_traces.append(tr)
             
             # Opret ny stream med kun unique channels
-            work_stream = Stream()
-            for tr in unique_channels.values():
-                work_stream.append(tr)
+            work_stream = Stream(traces=unique_traces)
             
-            print(f"DEBUG: After deduplication: {len(work_stream)} traces")
+            logger.debug("After deduplication: %d traces", len(work_stream))
             
             # Hent inventory for response removal
             inventory = None
             try:
-                print("DEBUG: Fetching station inventory...")
-                inventory = self.client.get_stations(
-                    network=station['network'],
-                    station=station['station'],
-                    starttime=start_time,
-                    endtime=end_time,
-                    level="response"
+                inventory = self._get_response_inventory(
+                    station['network'], station['station'], start_time, end_time
                 )
-                print("DEBUG: Inventory fetched successfully")
             except Exception as e:
-                print(f"DEBUG: Could not fetch inventory: {e}")
+                logger.debug("Could not fetch inventory: %s", e)
                 inventory = None
             
-            # Gem raw data FØRST (før response removal)
+            # Gem raw data FØRST (før response removal).
+            # remove_response allokerer nye arrays, så raw kan dele de
+            # originale arrays - kopi kun når data ikke bliver erstattet.
             raw_data = {}
             for tr in work_stream:
-                channel = tr.stats.channel
-                component = channel[-1]
-                
                 # Map til standard komponenter
-                if component == 'Z' or component == '3':
-                    raw_data['vertical'] = tr.data.copy()
-                elif component == 'N' or component == '1':
-                    raw_data['north'] = tr.data.copy()
-                elif component == 'E' or component == '2':
-                    raw_data['east'] = tr.data.copy()
+                name = COMPONENT_MAP.get(tr.stats.channel[-1])
+                if name:
+                    raw_data[name] = tr.data if inventory else tr.data.copy()
             
             # Response removal (hvis muligt)
             units = 'counts'
             if inventory:
                 try:
-                    print("DEBUG: Removing instrument response...")
+                    logger.debug("Removing instrument response...")
                     # Pre-filter design baseret på sampling rate
                     sample_rate = work_stream[0].stats.sampling_rate
                     nyquist = sample_rate / 2.0
@@ -946,19 +1488,28 @@ class StreamlinedDataManager:
                         plot=False
                     )
                     
-                    # Konverter fra meter til mm
+                    # float32 er rigeligt til seismiske data - halverer hukommelse
+                    # i alle efterfølgende filter/plot/Excel trin.
+                    # Konverter derefter fra meter til mm in-place.
                     for tr in work_stream:
-                        tr.data = tr.data * 1000.0
+                        tr.data = tr.data.astype(np.float32, copy=False)
+                        tr.data *= 1000.0
                     
                     units = 'mm'
-                    print("DEBUG: Response removal successful")
+                    logger.debug("Response removal successful")
                 except Exception as e:
-                    print(f"DEBUG: Response removal failed: {e}")
+                    logger.debug("Response removal failed: %s", e)
                     units = 'counts'
             
             # Byg output struktur med FULD opløsning
             waveform_data = {}
             
+            # Én tidsakse per (npts, sampling rate, offset) - deles mellem komponenter
+            time_cache = {}
+            
+            # Per komponent data (kun lokalt) - opslag uden scan over waveform_data nøgler
+            components_data = {}
+            
             # Process hver trace
             for tr in work_stream:
                 channel = tr.stats.channel
@@ -970,14 +1521,25 @@ class StreamlinedDataManager:
                 waveform_data[f'npts_{component}'] = tr.stats.npts
                 
                 # Generer time array (relativ til jordskælv)
-                eq_time = ensure_utc_datetime(earthquake.get('time'))
                 trace_start = tr.stats.starttime
                 time_offset = float(trace_start - eq_time)
-                times = np.arange(tr.stats.npts) / tr.stats.sampling_rate + time_offset
+                time_key = (tr.stats.npts, tr.stats.sampling_rate, time_offset)
+                times = time_cache.get(time_key)
+                if times is None:
+                    times = np.arange(tr.stats.npts, dtype=np.float32)
+                    times *= np.float32(1.0 / tr.stats.sampling_rate)
+                    times += np.float32(time_offset)
+                    time_cache[time_key] = times
                 waveform_data[f'time_{component}'] = times
+                
+                components_data[component] = {
+                    'waveform': tr.data,
+                    'sampling_rate': tr.stats.sampling_rate,
+                    'npts': tr.stats.npts,
+                    'time': times
+                }
             
             # Tilføj earthquake time
-            eq_time = ensure_utc_datetime(earthquake.get('time'))
             if eq_time:
                 waveform_data['earthquake_time'] = eq_time.strftime('%Y-%m-%d %H:%M:%S')
             
@@ -987,19 +1549,10 @@ class StreamlinedDataManager:
             
             # Byg displacement_data struktur
             displacement_data = {}
-            component_mapping = {
-                'Z': 'vertical', 
-                'N': 'north', 
-                'E': 'east',
-                '1': 'north',
-                '2': 'east',
-                '3': 'vertical'
-            }
-            
             mapped_components = set()
-            for comp, name in component_mapping.items():
-                if f'waveform_{comp}' in waveform_data and name not in mapped_components:
-                    displacement_data[name] = waveform_data[f'waveform_{comp}']
+            for comp, name in COMPONENT_MAP.items():
+                if comp in components_data and name not in mapped_components:
+                    displacement_data[name] = components_data[comp]['waveform']
                     mapped_components.add(name)
             
             if displacement_data:
@@ -1009,33 +1562,27 @@ class StreamlinedDataManager:
             waveform_data['raw_data'] = raw_data
             
             # Find sampling rate (højeste)
-            sampling_rates = [v for k, v in waveform_data.items() if k.startswith('sampling_rate_')]
-            if sampling_rates:
-                waveform_data['sampling_rate'] = max(sampling_rates)
+            if components_data:
+                waveform_data['sampling_rate'] = max(c['sampling_rate'] for c in components_data.values())
             else:
                 waveform_data['sampling_rate'] = 40.0  # fallback
             
             # Tilføj generel time array
-            if 'time_Z' in waveform_data:
-                waveform_data['time'] = waveform_data['time_Z']
-            elif any(k.startswith('time_') for k in waveform_data.keys()):
-                first_time_key = next(k for k in waveform_data.keys() if k.startswith('time_'))
-                waveform_data['time'] = waveform_data[first_time_key]
+            if components_data:
+                waveform_data['time'] = components_data.get('Z', next(iter(components_data.values())))['time']
             
             # Available components
-            available_components = []
-            for comp in ['Z', 'N', 'E', '1', '2', '3']:
-                if f'waveform_{comp}' in waveform_data:
-                    available_components.append(comp)
-            waveform_data['available_components'] = available_components
+            waveform_data['available_components'] = [
+                comp for comp in ['Z', 'N', 'E', '1', '2', '3'] if comp in components_data
+            ]
             
             # Data source
             waveform_data['data_source'] = 'IRIS'
             
             # Summary info
-            print(f"DEBUG: Final sampling rate: {waveform_data.get('sampling_rate')} Hz")
-            print(f"DEBUG: Data length: {len(waveform_data.get('time', []))} samples")
-            print(f"DEBUG: Units: {units}")
+            logger.debug("Final sampling rate: %s Hz", waveform_data.get('sampling_rate'))
+            logger.debug("Data length: %d samples", len(waveform_data.get('time', [])))
+            logger.debug("Units: %s", units)
             
             return waveform_data
             
@@ -1045,6 +1592,33 @@ class StreamlinedDataManager:
             traceback.print_exc()
             return None
     
+    def _get_response_inventory(self, network, station_code, start_time, end_time):
+        """
+        Henter response inventory med cache. StationXML gemmes som bytes i
+        session cache og parses via parse_station_xml (lru cache).
+        """
+        cache_key = f"{network}.{station_code}|{start_time.date}|{end_time.date}"
+        xml_bytes = self._check_cache('response_cache', cache_key)
+        
+        if xml_bytes is None:
+            logger.debug("Fetching station inventory...")
+            buffer = BytesIO()
+            self.client.get_stations(
+                network=network,
+                station=station_code,
+                starttime=start_time,
+                endtime=end_time,
+                level="response",
+                filename=buffer
+            )
+            xml_bytes = buffer.getvalue()
+            self._update_cache('response_cache', cache_key, xml_bytes)
+            logger.debug("Inventory fetched successfully")
+        else:
+            logger.debug("Using cached inventory for %s.%s", network, station_code)
+        
+        return parse_station_xml(xml_bytes)
+    
     def validate_and_correct_timing(self, waveform_data: Dict[str, Any], 
                                    earthquake: Dict[str, Any], 
                                    station: Dict[str, Any]) -> Dict[str, Any]:
@@ -1082,14 +1656,23 @@ class StreamlinedDataManager:
             )
             
             if detected_p and confidence > 0.7:
-                # Beregn korrektion
-                time_correction = detected_p - p_theoretical
+                # Beregn korrektion - Python float så float32 tidsakser ikke opcastes
+                time_correction = float(detected_p - p_theoretical)
                 
                 if abs(time_correction) < 10.0:  # Max 10 sekunder korrektion
-                    # Anvend korrektion
-                    for key in waveform_data:
-                        if key.startswith('time_'):
-                            waveform_data[key] = waveform_data[key] - time_correction
+                    # Anvend korrektion på alle tidsakser - også den generelle 'time',
+                    # så den følger time_{comp}. Komponenter deler ofte samme
+                    # tidsakse - kopier hver unik array én gang, så delte
+                    # referencer forbliver delte efter korrektionen.
+                    corrected = {}
+                    for key, values in waveform_data.items():
+                        if (key == 'time' or key.startswith('time_')) and isinstance(values, np.ndarray):
+                            shifted = corrected.get(id(values))
+                            if shifted is None:
+                                shifted = values.copy()
+                                shifted -= time_correction
+                                corrected[id(values)] = shifted
+                            waveform_data[key] = shifted
                     
                     waveform_data['timing_corrected'] = True
                     waveform_data['timing_correction'] = time_correction
@@ -1122,7 +1705,10 @@ class StreamlinedDataManager:
             """
             try:
                 output = BytesIO()
-                workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+                # constant_memory: rækker streames til disk én ad gangen i stedet
+                # for at hele arket holdes i RAM (in_memory ville slå det fra).
+                # Kræver at rækker skrives i stigende rækkefølge.
+                workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
                 
                 # Metadata sheet med formatering
                 metadata_sheet = workbook.add_worksheet('Metadata')
@@ -1196,7 +1782,7 @@ class StreamlinedDataManager:
                         's_waves': False
                     }
                 
-                # Headers og data kolonner
+                # Headers og data kolonner - kilde arrays slås op her, én gang
                 headers = ['Time (s)']
                 data_columns = []
                 
@@ -1208,14 +1794,14 @@ class StreamlinedDataManager:
                     for comp in components:
                         if comp in waveform_data['raw_data']:
                             headers.append(f'{comp.capitalize()}_Raw (counts)')
-                            data_columns.append(('raw_data', comp))
+                            data_columns.append(waveform_data['raw_data'][comp])
                 
                 # Tilføj displacement data hvis valgt
                 if export_options.get('unfiltered') and 'displacement_data' in waveform_data:
                     for comp in components:
                         if comp in waveform_data['displacement_data']:
                             headers.append(f'{comp.capitalize()} (mm)')
-                            data_columns.append(('displacement_data', comp))
+                            data_columns.append(waveform_data['displacement_data'][comp])
                 
                 # Tilføj filtrerede data hvis tilgængelige
                 filter_mapping = {
@@ -1231,7 +1817,7 @@ class StreamlinedDataManager:
                             for comp in components:
                                 if comp in waveform_data['filtered_datasets'][filter_key]:
                                     headers.append(f'{comp.capitalize()}_{filter_name} (mm)')
-                                    data_columns.append(('filtered_datasets', filter_key, comp))
+                                    data_columns.append(waveform_data['filtered_datasets'][filter_key][comp])
                 
                 # Skriv headers
                 for col, header in enumerate(headers):
@@ -1243,52 +1829,31 @@ class StreamlinedDataManager:
                 
                 if len(time_array) > max_samples and max_samples > 0:
                     # Beregn downsampling faktor
-                    factor = len(time_array) // max_samples
-                    indices = list(range(0, len(time_array), factor))[:max_samples]
+                    step = len(time_array) // max_samples
+                    rows = slice(0, step * max_samples, step)
                 else:
-                    indices = list(range(len(time_array)))
+                    rows = slice(None)
                 
-                # Skriv data
-                for row_idx, idx in enumerate(indices):
-                    row = row_idx + 1
-                    
-                    # Tid kolonne
-                    if idx < len(time_array):
-                        timeseries_sheet.write(row, 0, float(time_array[idx]))
-                    
-                    # Data kolonner
-                    col = 1
-                    for data_spec in data_columns:
-                        try:
-                            if len(data_spec) == 2:  # raw_data eller displacement_data
-                                data_type, component = data_spec
-                                if data_type in waveform_data and component in waveform_data[data_type]:
-                                    data_array = waveform_data[data_type][component]
-                                    if idx < len(data_array):
-                                        value = float(data_array[idx])
-                                    else:
-                                        value = 0.0
-                                else:
-                                    value = 0.0
-                            elif len(data_spec) == 3:  # filtered_datasets
-                                data_type, filter_key, component = data_spec
-                                if (data_type in waveform_data and 
-                                    filter_key in waveform_data[data_type] and 
-                                    component in waveform_data[data_type][filter_key]):
-                                    data_array = waveform_data[data_type][filter_key][component]
-                                    if idx < len(data_array):
-                                        value = float(data_array[idx])
-                                    else:
-                                        value = 0.0
-                                else:
-                                    value = 0.0
-                            else:
-                                value = 0.0
-                                
-                            timeseries_sheet.write(row, col, value)
-                        except (IndexError, ValueError, TypeError, KeyError):
-                            timeseries_sheet.write(row, col, 0.0)
-                        col += 1
+                # Saml alle kolonner i én matrix - manglende værdier bliver 0.0
+                # Tidsakser er float32 - afrund så Excel viser 100.01 og ikke 100.01000213
+                time_column = np.round(np.asarray(time_array, dtype=np.float64)[rows], 4)
+                matrix = np.zeros((len(time_column), len(headers)), dtype=np.float64)
+                matrix[:, 0] = time_column
+                
+                for col, source in enumerate(data_columns, start=1):
+                    try:
+                        # Kortere arrays giver færre rækker - resten forbliver 0.0
+                        column = np.asarray(source, dtype=np.float64)[rows][:len(time_column)]
+                        matrix[:len(column), col] = column
+                    except (IndexError, ValueError, TypeError):
+                        continue
+                
+                # Excel understøtter ikke NaN/inf
+                np.nan_to_num(matrix, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+                
+                # Skriv data rækkevis (constant_memory kræver rækkefølge)
+                for row, values in enumerate(matrix.tolist(), start=1):
+                    timeseries_sheet.write_row(row, 0, values)
                 
                 # Ms magnitude forklaring sheet (hvis tilgængelig)
                 if ms_explanation:
@@ -1378,13 +1943,21 @@ class StreamlinedDataManager:
     # ========================================
     
     def get_earthquake_details(self, event_id):
-        """Hent detaljer for specifikt jordskælv"""
+        """Hent detaljer for specifikt jordskælv - cached per event_id"""
+        cache_key = f"event_{event_id}"
+        cached = self._check_cache('earthquake_cache', cache_key)
+        if cached:
+            return cached
+        
         try:
-            catalog = self.client.get_events(eventid=event_id)
-            if catalog and len(catalog) > 0:
-                return self._process_catalog([catalog[0]])[0]
-        except:
-            pass
+            earthquakes = self._fetch_events(eventid=event_id)
+        except (FDSNException, ET.ParseError, OSError) as e:
+            logger.warning("Event %s kunne ikke hentes: %s", event_id, e)
+            return None
+        
+        if earthquakes:
+            self._update_cache('earthquake_cache', cache_key, earthquakes[0])
+            return earthquakes[0]
         return None
     
     def get_earthquakes_by_region(self, region_bounds, **kwargs):
@@ -1392,32 +1965,34 @@ class StreamlinedDataManager:
         try:
             minlat, maxlat, minlon, maxlon = region_bounds
             
-            catalog = self.client.get_events(
+            return self._fetch_events(
                 minlatitude=minlat,
                 maxlatitude=maxlat,
                 minlongitude=minlon,
                 maxlongitude=maxlon,
                 **kwargs
             )
-            
-            return self._process_catalog(catalog)
         except Exception as e:
             st.error(f"Region søgning fejlede: {str(e)}")
             return []
     
     def clear_all_cache(self):
         """Rydder al cache"""
-        cache_types = ['earthquake_cache', 'station_cache', 'waveform_cache', 'inventory_cache']
+        cache_types = ['earthquake_cache', 'station_cache', 'waveform_cache', 'inventory_cache', 'response_cache']
+        freed_bytes = 0
         for cache_type in cache_types:
-            if cache_type in st.session_state:
-                del st.session_state[cache_type]
+            freed_bytes += cached_nbytes(st.session_state.pop(cache_type, None))
         print("All cache cleared")
-        gc.collect()
+        
+        # Arrays frigives via reference counting - fuld GC pause kun når store
+        # data (fx ObsPy traces i reference cykler) er sluppet
+        if freed_bytes > GC_CACHE_THRESHOLD_MB * 1024 * 1024:
+            gc.collect()
     
     def get_cache_stats(self):
         """Cache statistik"""
         stats = {}
-        cache_types = ['earthquake_cache', 'station_cache', 'waveform_cache', 'inventory_cache']
+        cache_types = ['earthquake_cache', 'station_cache', 'waveform_cache', 'inventory_cache', 'response_cache']
         for cache_type in cache_types:
             stats[cache_type] = len(st.session_state.get(cache_type, {}))
         return stats
@@ -4,22 +4,52 @@ Seismic data processing engine for GEOSeis
 Avanceret seismisk dataprocessering med fokus på professional analyse
 """
 
+import math
+import traceback
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-from scipy.signal import butter, filtfilt, medfilt
-from scipy.fft import fft, fftfreq
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+from scipy.fft import rfft, rfftfreq, next_fast_len
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 # ObsPy imports - check availability
 try:
     from obspy.geodetics import locations2degrees, gps2dist_azimuth
-    from obspy.taup import TauPyModel
+    from obspy import UTCDateTime
+    # Samme process-globale TauPyModel som data_manager - kun én iasp91 model i hukommelsen
+    from taup_model import get_cached_taup_model
     ADVANCED_FEATURES = True
 except ImportError:
     ADVANCED_FEATURES = False
     print("Warning: Some ObsPy features not available")
 
+# Skalering af MAD til standardafvigelse for normalfordelt støj
+MAD_SCALE = 1.4826
+
+# Vindue (samples) for median erstatning af spikes
+SPIKE_WINDOW = 5
+
+# Typiske sampling rates (Hz) hvor filtre designes på forhånd (HH, BH, LH/SH)
+COMMON_SAMPLING_RATES = (100.0, 40.0, 20.0)
+
+# Timing validering: gennemsnitlig P-bølge hastighed (km/s), relativ og minimum tolerance
+AVG_P_VELOCITY = 7.5
+TIMING_TOLERANCE = 0.1
+TIMING_MIN_THRESHOLD_S = 5.0
+
+
+def ms_peaks(vertical, north, east):
+    """
+    Maksimale absolutte amplituder til Ms: (|Z|, |N|, |E|, horisontal vektor).
+    |x|max tages som max(x.max(), -x.min()) uden abs-kopier, og den
+    horisontale vektor beregnes med én hypot-buffer.
+    """
+    peaks = [max(float(c.max()), -float(c.min())) for c in (vertical, north, east)]
+    peaks.append(float(np.hypot(north, east).max()))
+    return tuple(peaks)
+
 class EnhancedSeismicProcessor:
     """
     Avanceret seismisk dataprocessering med fokus på professional analyse.
@@ -42,30 +72,20 @@ class EnhancedSeismicProcessor:
     Example:
         processor = EnhancedSeismicProcessor()
         filtered_data = processor.apply_bandpass_filter(data, 100, 1.0, 10.0)
-        ms_mag, explanation = processor.calculate_ms_magnitude(north, east, vert, 1500, 100)
+        ms_mag, info = processor.calculate_ms_magnitude(north, east, vert, 1500, 100)
+        explanation = processor.format_ms_explanation(info)
     """
     
 
     def __init__(self):
         """
         Initialiserer seismisk processor med standard parametre.
-        Bruger cached TauPyModel fra session state.
+        Bruger process-global cached TauPyModel (st.cache_resource).
         """
         # TauP model til rejsetidsberegninger - BRUG CACHED VERSION
         if ADVANCED_FEATURES:
             try:
-                # Check om vi er i Streamlit miljø
-                try:
-                    import streamlit as st
-                    if 'taup_model' not in st.session_state:
-                        st.session_state.taup_model = TauPyModel(model="iasp91")
-                        print("SeismicProcessor: TauPyModel initialized ONCE in session state")
-                    self.taup_model = st.session_state.taup_model
-                    # Ingen print her - vi bruger bare cached version
-                except ImportError:
-                    # Ikke i Streamlit - brug normal init
-                    self.taup_model = TauPyModel(model="iasp91")
-                    print("SeismicProcessor: TauPyModel initialized (non-Streamlit)")
+                self.taup_model = get_cached_taup_model()
             except Exception as e:
                 print(f"SeismicProcessor: Could not initialize TauPyModel: {e}")
                 self.taup_model = None
@@ -86,37 +106,47 @@ class EnhancedSeismicProcessor:
         self.filter_order = 4  # Butterworth filter orden
         self.spike_threshold = 5.0  # Z-score for spike detektion
         
+        # Designede filtre (SOS) - nøgle: (type, orden, sampling rate, lav, høj)
+        self._sos_cache = {}
+        self._precompute_filters()
+        
         # Debug output
         print(f"SeismicProcessor initialized with cached TauP: {'Yes' if self.taup_model else 'No'}")
 
 
 
-    def apply_bandpass_filter(self, data, sampling_rate, low_freq, high_freq, order=None):
+    def apply_bandpass_filter(self, data, sampling_rate, low_freq, high_freq, order=None,
+                              zero_phase=True):
         """
         Anvender Butterworth båndpas filter på seismiske data med brugervenlig feedback.
         FORBEDRET: Bedre håndtering af edge cases og mere informativ feedback.
+        
+        zero_phase=False filtrerer kun forlæns (halvt arbejde) - nok når kun
+        amplituder skal bruges, men giver faseforskydning i seismogrammet.
         """
         if order is None:
             order = self.filter_order
             
         try:
-            # Validate input data
-            data = np.array(data)
+            # Validate input data - float32 er rigeligt til seismiske amplituder.
+            # asarray kopierer ikke når data allerede er float32 (data muteres ikke her)
+            data = np.asarray(data, dtype=np.float32)
             if len(data) == 0:
                 return data, {'success': False, 'reason': 'empty_data', 
                              'message': '❌ Ingen data at filtrere'}
             
-            # Check for NaN eller inf
-            if np.any(np.isnan(data)) or np.any(np.isinf(data)):
+            # Check for NaN eller inf - én isfinite maske bruges til både check og rensning
+            finite_mask = np.isfinite(data)
+            if not finite_mask.all():
                 # Prøv at rense data
-                clean_data = data[np.isfinite(data)]
-                if len(clean_data) < len(data) * 0.5:  # Hvis mere end 50% er dårligt
+                n_bad = data.size - np.count_nonzero(finite_mask)
+                if n_bad > data.size * 0.5:  # Hvis mere end 50% er dårligt
                     return data, {
                         'success': False, 
                         'reason': 'invalid_data',
                         'message': '❌ For mange ugyldige værdier i data'
                     }
-                data = clean_data
+                data = data[finite_mask]
             
             nyquist = sampling_rate / 2.0
             
@@ -131,8 +161,8 @@ class EnhancedSeismicProcessor:
                         'suggestion': f'Prøv en frekvens under {nyquist * 0.8:.1f} Hz'
                     }
                 
-                b, a = butter(order, high_freq / nyquist, btype='high')
                 filter_type = 'highpass'
+                sos = self._design_sos(filter_type, order, sampling_rate, None, high_freq)
                 
             # Hvis high_freq er None, brug lowpass filter
             elif high_freq is None or high_freq >= nyquist:
@@ -144,8 +174,8 @@ class EnhancedSeismicProcessor:
                         'message': f'❌ Lav frekvens ({low_freq:.1f} Hz) for tæt på Nyquist ({nyquist:.1f} Hz)'
                     }
                 
-                b, a = butter(order, low_freq / nyquist, btype='low')
                 filter_type = 'lowpass'
+                sos = self._design_sos(filter_type, order, sampling_rate, low_freq, None)
                 
             else:
                 # Bandpass filter - standard case
@@ -170,12 +200,13 @@ class EnhancedSeismicProcessor:
                     low_freq = adjusted_low
                 
                 # Design filter
-                b, a = butter(order, [low_freq / nyquist, high_freq / nyquist], btype='band')
                 filter_type = 'bandpass'
+                sos = self._design_sos(filter_type, order, sampling_rate, low_freq, high_freq)
             
             # Apply filter
             try:
-                filtered_data = filtfilt(b, a, data)
+                # SciPy filtrerer internt i float64 (SOS koefficienter) - tilbage til float32
+                filtered_data = self._run_sos(sos, data, zero_phase).astype(np.float32)
                 
                 # Validate output
                 if np.any(np.isnan(filtered_data)) or np.any(np.isinf(filtered_data)):
@@ -215,6 +246,62 @@ class EnhancedSeismicProcessor:
                 'message': f'❌ Uventet fejl: {str(e)}'
             }
     
+    def _precompute_filters(self, sampling_rates=COMMON_SAMPLING_RATES):
+        """
+        Designer SOS for alle prædefinerede filterbånd ved typiske sampling rates,
+        med samme frekvensjusteringer som apply_bandpass_filter.
+        """
+        for band in self.filter_bands.values():
+            if band is None:
+                continue
+            for sampling_rate in sampling_rates:
+                nyquist = sampling_rate / 2.0
+                low_freq, high_freq = band
+                if high_freq >= nyquist:
+                    # apply_bandpass_filter bruger lowpass når høj frekvens >= Nyquist
+                    if low_freq < nyquist * 0.95:
+                        self._design_sos('lowpass', self.filter_order, sampling_rate, low_freq, None)
+                    continue
+                if high_freq >= nyquist * 0.95:
+                    high_freq = nyquist * 0.9
+                if low_freq <= 0.001:
+                    low_freq = 0.005
+                if low_freq < high_freq:
+                    self._design_sos('bandpass', self.filter_order, sampling_rate, low_freq, high_freq)
+    
+    def _run_sos(self, sos, data, zero_phase=True, axis=-1):
+        """
+        Kører SOS filter. Zero-phase via sosfiltfilt, ellers ét forlæns pas
+        med sosfilt startet i steady-state fra første sample (undgår indsvingning).
+        """
+        if zero_phase:
+            return sosfiltfilt(sos, data, axis=axis)
+        
+        data = np.moveaxis(np.asarray(data), axis, -1)
+        # zi form: (sektioner, ..., 2) skaleret med første sample for hver række
+        zi = sosfilt_zi(sos).reshape((sos.shape[0],) + (1,) * (data.ndim - 1) + (2,))
+        zi = zi * data[..., :1]
+        filtered, _ = sosfilt(sos, data, axis=-1, zi=zi)
+        return np.moveaxis(filtered, -1, axis)
+    
+    def _design_sos(self, filter_type, order, sampling_rate, low_freq, high_freq):
+        """
+        Designer Butterworth filter som second-order sections med cache.
+        SOS er numerisk stabilt for høje ordener og billigere at anvende end b, a.
+        """
+        key = (filter_type, order, round(sampling_rate, 3), low_freq, high_freq)
+        sos = self._sos_cache.get(key)
+        if sos is None:
+            nyquist = sampling_rate / 2.0
+            if filter_type == 'highpass':
+                sos = butter(order, high_freq / nyquist, btype='high', output='sos')
+            elif filter_type == 'lowpass':
+                sos = butter(order, low_freq / nyquist, btype='low', output='sos')
+            else:
+                sos = butter(order, [low_freq / nyquist, high_freq / nyquist], btype='band', output='sos')
+            self._sos_cache[key] = sos
+        return sos
+    
     def process_waveform_with_filtering(self, waveform_data, filter_type='broadband', 
                                       remove_spikes=True, calculate_noise=False):
         """
@@ -231,7 +318,8 @@ class EnhancedSeismicProcessor:
             'spike_info': {},
             'noise_info': {},
             'filter_status': {},
-            'used_highres': False
+            'used_highres': False,
+            '_shared_buffers': False  # True hvis filtered_data deler arrays med original_data - må ikke muteres in-place
         }
         
         # Check for high-resolution data
@@ -271,129 +359,163 @@ class EnhancedSeismicProcessor:
             'sampling_rate': sampling_rate
         }
         
-        # Process hver komponent
+        # Process komponenter parallelt - filtrering og median kører i
+        # SciPy/NumPy C-kode uden GIL. Resultater samles bagefter i fast rækkefølge.
         components = ['north', 'east', 'vertical']
+        with ThreadPoolExecutor(max_workers=len(components)) as executor:
+            results = list(executor.map(
+                lambda component: self._process_component(
+                    waveform_data, component, has_highres, sampling_rate,
+                    low_freq, high_freq, remove_spikes, calculate_noise
+                ),
+                components
+            ))
+        
+        for component, result in zip(components, results):
+            processed_data['filter_status'][component] = result['status']
+            if result.get('shared'):
+                processed_data['_shared_buffers'] = True
+            for key, target in (('original', 'original_data'), ('filtered', 'filtered_data'),
+                                ('spikes', 'spike_info'), ('noise', 'noise_info')):
+                if key in result:
+                    processed_data[target][component] = result[key]
+        
+        return processed_data
+    
+    def _process_component(self, waveform_data, component, has_highres, sampling_rate,
+                           low_freq, high_freq, remove_spikes, calculate_noise):
+        """
+        Spike fjernelse, filtrering og evt. SNR for én komponent.
+        Returnerer dict med 'status' og de beregnede dele (original, filtered, spikes, noise,
+        shared).
+        """
         component_mapping = {
             'north': ['N', '1'],
             'east': ['E', '2'],
             'vertical': ['Z', '3']
         }
+        result = {}
         
-        for component in components:
-            try:
-                # Find data for denne komponent
-                data = None
-                
-                # Prioriter high-res data hvis tilgængelig
-                if has_highres:
-                    # Check for high-res waveform data
-                    for suffix in component_mapping[component]:
-                        if f'waveform_{suffix}' in waveform_data:
-                            data = waveform_data[f'waveform_{suffix}']
-                            print(f"DEBUG: Using high-res data for {component} from waveform_{suffix}")
-                            break
-                
-                # Fallback til displacement_data
-                if data is None and 'displacement_data' in waveform_data:
-                    if component in waveform_data['displacement_data']:
-                        data = waveform_data['displacement_data'][component]
-                        print(f"DEBUG: Using displacement data for {component}")
-                
-                if data is None:
-                    print(f"DEBUG: No data found for {component}")
-                    processed_data['filter_status'][component] = 'no_data'
-                    continue
-                
-                # Konverter til numpy array og valider
-                data = np.array(data)
-                
-                # KRITISK: Sørg for at data er 1D array
-                if data.ndim > 1:
-                    print(f"WARNING: {component} data has shape {data.shape}, flattening to 1D")
-                    data = data.flatten()
-                
-                # Gem original data
-                processed_data['original_data'][component] = data.copy()
-                
-                # Spike removal hvis requested
-                if remove_spikes:
-                    data_cleaned, spike_count = self.remove_spikes(data)
-                    processed_data['spike_info'][component] = spike_count
-                    data = data_cleaned
-                
+        try:
+            # Find data for denne komponent
+            data = None
+            
+            # Prioriter high-res data hvis tilgængelig
+            if has_highres:
+                # Check for high-res waveform data
+                for suffix in component_mapping[component]:
+                    if f'waveform_{suffix}' in waveform_data:
+                        data = waveform_data[f'waveform_{suffix}']
+                        print(f"DEBUG: Using high-res data for {component} from waveform_{suffix}")
+                        break
+            
+            # Fallback til displacement_data
+            if data is None and 'displacement_data' in waveform_data:
+                if component in waveform_data['displacement_data']:
+                    data = waveform_data['displacement_data'][component]
+                    print(f"DEBUG: Using displacement data for {component}")
+            
+            if data is None:
+                print(f"DEBUG: No data found for {component}")
+                result['status'] = 'no_data'
+                return result
+            
+            # Konverter til float32 numpy array og valider - uden kopi hvis muligt
+            data = np.asarray(data, dtype=np.float32)
+            
+            # KRITISK: Sørg for at data er 1D array
+            if data.ndim > 1:
+                print(f"WARNING: {component} data has shape {data.shape}, flattening to 1D")
+            data = np.ascontiguousarray(data).ravel()
+            
+            # Gem original data som reference - spike removal og filter
+            # returnerer nye arrays, så originalen muteres aldrig
+            result['original'] = data
+            
+            # Spike removal hvis requested
+            if remove_spikes:
+                data_cleaned, spike_count = self.remove_spikes(data)
+                result['spikes'] = spike_count
+                data = data_cleaned
+            
+            # Apply filter
+            if low_freq is None and high_freq is None:
+                # Broadband - ingen filtrering. Uden spike removal deles bufferen
+                # med original data i stedet for at kopiere
+                filtered_data = data
+                result['shared'] = not remove_spikes
+                filter_result = {'success': True, 'filter_type': 'none'}
+            else:
                 # Apply filter
-                if low_freq is None and high_freq is None:
-                    # Broadband - ingen filtrering, men kopier data
-                    filtered_data = data.copy()
-                    filter_result = {'success': True, 'filter_type': 'none'}
-                else:
-                    # Apply filter
-                    filtered_data, filter_result = self.apply_bandpass_filter(
-                        data, 
-                        sampling_rate, 
-                        low_freq, 
-                        high_freq
-                    )
-                
-                # KRITISK: Sørg for at filtered_data er 1D numpy array
-                filtered_data = np.array(filtered_data)
-                if filtered_data.ndim > 1:
-                    filtered_data = filtered_data.flatten()
-                
-                # Gem filtreret data
-                processed_data['filtered_data'][component] = filtered_data
-                
-                # Update status
-                if filter_result.get('success', False):
-                    processed_data['filter_status'][component] = 'success'
-                else:
-                    processed_data['filter_status'][component] = filter_result.get('reason', 'error')
-                
-                # Beregn noise hvis requested
-                if calculate_noise and filter_result.get('success', False):
-                    noise_level = np.std(filtered_data[:int(5*sampling_rate)])  # Første 5 sekunder
-                    signal_level = np.max(np.abs(filtered_data))
-                    snr = signal_level / noise_level if noise_level > 0 else 0
-                    
-                    processed_data['noise_info'][component] = {
-                        'noise_level': noise_level,
-                        'signal_level': signal_level,
-                        'snr': snr
-                    }
+                filtered_data, filter_result = self.apply_bandpass_filter(
+                    data, 
+                    sampling_rate, 
+                    low_freq, 
+                    high_freq
+                )
+            
+            # KRITISK: Sørg for at filtered_data er 1D numpy array
+            filtered_data = np.ascontiguousarray(filtered_data).ravel()
+            
+            # Gem filtreret data
+            result['filtered'] = filtered_data
+            
+            # Update status
+            if filter_result.get('success', False):
+                result['status'] = 'success'
+            else:
+                result['status'] = filter_result.get('reason', 'error')
+            
+            # Beregn noise hvis requested
+            if calculate_noise and filter_result.get('success', False):
+                noise_level = np.std(filtered_data[:int(5*sampling_rate)])  # Første 5 sekunder
+                signal_level = np.max(np.abs(filtered_data))
+                snr = signal_level / noise_level if noise_level > 0 else 0
                 
-            except Exception as e:
-                print(f"Filter error for {component}: {e}")
-                import traceback
-                traceback.print_exc()
-                processed_data['filter_status'][component] = f'error: {str(e)}'
-                # Sørg for at vi har noget data at vise
-                if component in processed_data['original_data']:
-                    processed_data['filtered_data'][component] = processed_data['original_data'][component].copy()
+                result['noise'] = {
+                    'noise_level': noise_level,
+                    'signal_level': signal_level,
+                    'snr': snr
+                }
+            
+        except Exception as e:
+            print(f"Filter error for {component}: {e}")
+            import traceback
+            traceback.print_exc()
+            result['status'] = f'error: {str(e)}'
+            # Sørg for at vi har noget data at vise
+            if 'original' in result:
+                result['filtered'] = result['original'].copy()
         
-        return processed_data
+        return result
 
     def remove_spikes(self, data, threshold=None):
         """Fjerner spikes fra data ved hjælp af median filter."""
         if threshold is None:
             threshold = self.spike_threshold
             
-        # Kopier data
-        cleaned_data = data.copy()
+        # Kopier data som float32
+        cleaned_data = np.array(data, dtype=np.float32)
         
-        # Beregn median og MAD (Median Absolute Deviation)
+        # Beregn median og MAD (Median Absolute Deviation).
+        # Én afvigelses-buffer bruges til både MAD og spike detektion.
         median = np.median(cleaned_data)
-        mad = np.median(np.abs(cleaned_data - median))
+        deviation = np.subtract(cleaned_data, median,
+                                dtype=np.result_type(cleaned_data.dtype, np.float32))
+        np.abs(deviation, out=deviation)
+        mad = np.median(deviation)
         
-        # Find spikes
+        # Find spikes (|x - median| / (MAD_SCALE * mad) > threshold)
         if mad > 0:
-            z_scores = np.abs(cleaned_data - median) / (1.4826 * mad)
-            spike_indices = np.where(z_scores > threshold)[0]
+            spike_indices = np.flatnonzero(deviation > threshold * MAD_SCALE * mad)
             
-            # Erstat spikes med median filter værdi
+            # Erstat spikes med median af 5-punkts vindue - kun ved spikes.
+            # Nul-padding svarer til medfilt's kanthåndtering.
             if len(spike_indices) > 0:
-                window_size = 5
-                median_filtered = medfilt(cleaned_data, window_size)
-                cleaned_data[spike_indices] = median_filtered[spike_indices]
+                half_window = SPIKE_WINDOW // 2
+                padded = np.pad(cleaned_data, half_window)
+                windows = spike_indices[:, None] + np.arange(SPIKE_WINDOW)[None, :]
+                cleaned_data[spike_indices] = np.median(padded[windows], axis=1)
                 
             return cleaned_data, len(spike_indices)
         else:
@@ -417,12 +539,13 @@ class EnhancedSeismicProcessor:
             earthquake_depth_km: Jordskælv dybde i km (optional)
             
         Returns:
-            tuple: (ms_magnitude, forklaring_dict) eller (None, fejl_dict)
+            tuple: (ms_magnitude, info_dict) eller (None, fejl_dict).
+            info_dict omsættes til tekst med format_ms_explanation.
             
         Example:
             ms, info = processor.calculate_ms_magnitude(N, E, Z, 1500, 100, 35)
             print(f"Ms = {ms:.1f}")
-            print(info['formula'])
+            print(processor.format_ms_explanation(info))
         """
         try:
             # Input validering
@@ -454,18 +577,32 @@ class EnhancedSeismicProcessor:
             low_freq = 0.02  # 50 sekunder periode
             high_freq = min(0.5, nyquist * 0.9)  # 2 sekunder periode eller Nyquist grænse
             
-            filtered_vert, _ = self.apply_bandpass_filter(vertical_data, sampling_rate, low_freq, high_freq)
-            filtered_north, _ = self.apply_bandpass_filter(north_data, sampling_rate, low_freq, high_freq)
-            filtered_east, _ = self.apply_bandpass_filter(east_data, sampling_rate, low_freq, high_freq)
+            components = [np.asarray(c, dtype=np.float64) for c in (vertical_data, north_data, east_data)]
             
-            # Find maksimum amplitude i mikrometer (konverter fra mm)
-            max_vert = np.max(np.abs(filtered_vert)) * 1000  # mm til μm
-            max_north = np.max(np.abs(filtered_north)) * 1000
-            max_east = np.max(np.abs(filtered_east)) * 1000
+            # Trim til fælles længde - peaks og horisontal vektor kræver ens længder
+            common_len = min(len(c) for c in components)
+            components = [c[:common_len] for c in components]
             
-            # Horizontal vektor amplitude
-            horizontal_amplitudes = np.sqrt(filtered_north**2 + filtered_east**2) * 1000
-            max_horizontal = np.max(horizontal_amplitudes)
+            if all(np.isfinite(c).all() for c in components):
+                # Gyldige data - filtrer alle tre i ét 2-D kald
+                sos = self._design_sos('bandpass', self.filter_order, sampling_rate, low_freq, high_freq)
+                # Kun peak amplitude bruges - ét forlæns pas er nok
+                filtered = self._run_sos(sos, np.stack(components), zero_phase=False, axis=1)
+                filtered_vert, filtered_north, filtered_east = filtered
+            else:
+                # Ugyldige samples fjernes af apply_bandpass_filter - trim igen bagefter
+                filtered = [
+                    self.apply_bandpass_filter(c, sampling_rate, low_freq, high_freq, zero_phase=False)[0]
+                    for c in components
+                ]
+                common_len = min(len(c) for c in filtered)
+                filtered_vert, filtered_north, filtered_east = (c[:common_len] for c in filtered)
+            
+            # Find maksimum amplituder i mikrometer (konverter fra mm) - alle fire
+            # reduktioner i ét kald, kun skalarerne skaleres
+            max_vert, max_north, max_east, max_horizontal = (
+                peak * 1000 for peak in ms_peaks(filtered_vert, filtered_north, filtered_east)
+            )
             
             # Vælg største amplitude (standard praksis)
             amplitude_um = max(max_vert, max_horizontal)
@@ -482,7 +619,10 @@ class EnhancedSeismicProcessor:
             # Ms = log10(A/T) + 1.66*log10(Δ) + 3.3
             # hvor A er amplitude i μm, T er periode i sekunder, Δ er afstand i grader
             
-            ms_magnitude = np.log10(amplitude_um / period_s) + 1.66 * np.log10(distance_deg) + 3.3
+            # Skalar log10 via math - hver størrelse beregnes én gang og genbruges i forklaringen
+            log_amplitude_period = math.log10(amplitude_um / period_s)
+            log_distance = math.log10(distance_deg)
+            ms_magnitude = log_amplitude_period + 1.66 * log_distance + 3.3
             
             # Dybdekorrektion for dybe jordskælv (hvis dybde > 50 km)
             depth_correction = 0
@@ -494,87 +634,107 @@ class EnhancedSeismicProcessor:
             # Afrund til en decimal
             ms_magnitude = round(ms_magnitude, 1)
             
-            # Byg forklaring som formateret tekst
-            explanation = f"""### Ms Magnitude Beregning
+            # Kun tal i hot path - tekst bygges af format_ms_explanation ved visning
+            info = {
+                'ms': ms_magnitude,
+                'used_component': used_component,
+                'max_north': max_north,
+                'max_east': max_east,
+                'max_vert': max_vert,
+                'max_horizontal': max_horizontal,
+                'amplitude_um': amplitude_um,
+                'period_s': period_s,
+                'distance_km': distance_km,
+                'distance_deg': distance_deg,
+                'low_freq': low_freq,
+                'high_freq': high_freq,
+                'log_adt': log_amplitude_period,
+                'log_d': log_distance,
+                'depth_km': earthquake_depth_km,
+                'depth_correction': depth_correction
+            }
+            
+            return ms_magnitude, info
+            
+        except Exception as e:
+            return None, {
+                'error': 'Beregningsfejl',
+                'message': str(e),
+                'trace': traceback.format_exc()
+            }
 
-            **Beregnet Ms:** {ms_magnitude:.1f}
+    def format_ms_explanation(self, info):
+        """
+        Bygger markdown forklaring af Ms beregningen ud fra info dict
+        returneret af calculate_ms_magnitude.
+        """
+        explanation = f"""### Ms Magnitude Beregning
 
-            **Anvendt komponent:** {used_component.capitalize()}
+            **Beregnet Ms:** {info['ms']:.1f}
+
+            **Anvendt komponent:** {info['used_component'].capitalize()}
 
             **Amplitude værdier:**
-            - Nord: {max_north:.1f} μm
-            - Øst: {max_east:.1f} μm
-            - Vertikal: {max_vert:.1f} μm
-            - Horizontal (max): {max_horizontal:.1f} μm
+            - Nord: {info['max_north']:.1f} μm
+            - Øst: {info['max_east']:.1f} μm
+            - Vertikal: {info['max_vert']:.1f} μm
+            - Horizontal (max): {info['max_horizontal']:.1f} μm
 
             **Beregningsparametre:**
-            - Periode (T): {period_s:.1f} s
-            - Afstand: {distance_km:.0f} km ({distance_deg:.1f}°)
-            - Filter: {low_freq}-{high_freq} Hz
+            - Periode (T): {info['period_s']:.1f} s
+            - Afstand: {info['distance_km']:.0f} km ({info['distance_deg']:.1f}°)
+            - Filter: {info['low_freq']}-{info['high_freq']} Hz
 
             **Formel:**
             Ms = log₁₀(A/T) + 1.66×log₁₀(Δ) + 3.3
 
             **Beregning:**
-            Ms = log₁₀({amplitude_um:.1f}/{period_s}) + 1.66×log₁₀({distance_deg:.1f}) + 3.3
-            Ms = {np.log10(amplitude_um/period_s):.3f} + 1.66×{np.log10(distance_deg):.3f} + 3.3
-            Ms = {np.log10(amplitude_um/period_s):.3f} + {1.66*np.log10(distance_deg):.3f} + 3.3
-            Ms = {ms_magnitude:.1f}"""
+            Ms = log₁₀({info['amplitude_um']:.1f}/{info['period_s']}) + 1.66×log₁₀({info['distance_deg']:.1f}) + 3.3
+            Ms = {info['log_adt']:.3f} + 1.66×{info['log_d']:.3f} + 3.3
+            Ms = {info['log_adt']:.3f} + {1.66*info['log_d']:.3f} + 3.3
+            Ms = {info['ms']:.1f}"""
 
-            if earthquake_depth_km and earthquake_depth_km > 50 and depth_correction != 0:
-                explanation += f"\n\n**Dybdekorrektion:** {depth_correction:.3f} (dybde: {earthquake_depth_km} km)"
-            
-            return ms_magnitude, explanation
-            
-        except Exception as e:
-            return None, {
-                'error': 'Beregningsfejl',
-                'message': str(e),
-                'trace': traceback.format_exc()
-            }
+        if info['depth_correction'] != 0:
+            explanation += f"\n\n**Dybdekorrektion:** {info['depth_correction']:.3f} (dybde: {info['depth_km']} km)"
+        
+        return explanation
 
+    def amplitude_spectrum(self, data, sampling_rate):
+        """
+        Amplitudespektrum for reelle seismiske data via rfft.
+        Padder til hurtig FFT længde - amplituder normaliseres med original længde.
+        
+        Returns:
+            tuple: (frekvenser, amplituder) for frekvenser > 0
+        """
+        data = np.asarray(data, dtype=np.float64)
+        n = len(data)
+        n_fft = next_fast_len(n, real=True)
+        
+        spectrum = rfft(data, n=n_fft, workers=-1)
+        frequencies = rfftfreq(n_fft, 1.0 / sampling_rate)
+        
+        # Spring DC over - kun positive frekvenser
+        return frequencies[1:], np.abs(spectrum[1:]) * 2 / n
+    
     def validate_earthquake_timing(self, earthquake, station, waveform_data):
         """
         Validerer earthquake timing baseret på forventede vs observerede P-wave ankomster.
-        OPDATERET: Håndterer UTCDateTime string format korrekt.
+        p_arrival forventes i sekunder efter jordskælv (UTCDateTime accepteres også).
         """
         try:
-            # Få jordskælv tid
-            eq_time = earthquake.get('time')
-            if isinstance(eq_time, str):
-                # Parse ISO format eller anden string format
-                from obspy import UTCDateTime
-                eq_time = UTCDateTime(eq_time)
-            
             # Få afstand
             distance_km = station.get('distance_km', 0)
             
-            # Få P arrival fra station (kan være string eller float)
+            # P arrival gemmes som sekunder efter jordskælv (se search_stations)
             p_arrival = station.get('p_arrival')
             
-            # Debug output
-            print(f"DEBUG validate_timing: p_arrival type: {type(p_arrival)}, value: {p_arrival}")
-            
-            # Parse p_arrival hvis det er en UTCDateTime string
-            if isinstance(p_arrival, str) and 'UTCDateTime' in p_arrival:
-                # Parse UTCDateTime string format: "UTCDateTime(2025, 1, 7, 1, 8, 36, 353168)"
-                import re
-                match = re.search(r'UTCDateTime\((.*?)\)', p_arrival)
-                if match:
-                    params = match.group(1).split(',')
-                    params = [int(p.strip()) for p in params]
-                    
-                    # Opret UTCDateTime objekt
-                    from obspy import UTCDateTime
-                    p_arrival_utc = UTCDateTime(*params)
-                    
-                    # Beregn sekunder fra jordskælv
-                    p_arrival_seconds = float(p_arrival_utc - eq_time)
-                    print(f"DEBUG: Converted p_arrival to {p_arrival_seconds} seconds")
-                    p_arrival = p_arrival_seconds
-            elif isinstance(p_arrival, (int, float)):
-                # Allerede i sekunder
+            if isinstance(p_arrival, (int, float, np.floating)):
+                # Hurtig vej - allerede i sekunder
                 p_arrival_seconds = float(p_arrival)
+            elif ADVANCED_FEATURES and isinstance(p_arrival, UTCDateTime):
+                # Absolut tid - konverter til sekunder fra jordskælv
+                p_arrival_seconds = float(p_arrival - UTCDateTime(earthquake.get('time')))
             else:
                 # Ukendt format
                 print(f"WARNING: Unknown p_arrival format: {type(p_arrival)}")
@@ -584,14 +744,13 @@ class EnhancedSeismicProcessor:
                 return True, "Kunne ikke validere timing - mangler P-wave ankomst", {}
             
             # Beregn teoretisk P-wave hastighed (simplified)
-            avg_p_velocity = 7.5  # km/s gennemsnit
-            expected_p_time = distance_km / avg_p_velocity
+            expected_p_time = distance_km / AVG_P_VELOCITY
             
             # Sammenlign
             time_diff = abs(p_arrival_seconds - expected_p_time)
             
             # Threshold for acceptable forskel (10% eller 5 sekunder)
-            threshold = max(expected_p_time * 0.1, 5.0)
+            threshold = max(expected_p_time * TIMING_TOLERANCE, TIMING_MIN_THRESHOLD_S)
             
             is_valid = time_diff < threshold
             
@@ -608,9 +767,6 @@ class EnhancedSeismicProcessor:
                 'distance_km': distance_km
             }
             
-            # Debug output
-            print(f"DEBUG: Final p_arrival_observed: {p_arrival_seconds} seconds (type: {type(p_arrival_seconds)})")
-            
             return is_valid, message, info
             
         except Exception as e:
@@ -619,20 +775,61 @@ class EnhancedSeismicProcessor:
             traceback.print_exc()
             return True, "Kunne ikke validere timing", {}
 
+    def validate_earthquake_timing_bulk(self, earthquake, stations):
+        """
+        Vektoriseret timing validering for mange stationer på én gang.
+        Samme kriterie som validate_earthquake_timing; stationer uden brugbar
+        P-ankomst regnes som gyldige.
+        
+        Returns:
+            tuple: (valid_mask, time_diff, messages) hvor messages kun
+            indeholder advarsler for ugyldige stationer (index -> tekst)
+        """
+        eq_time = None
+        
+        def p_seconds(station):
+            nonlocal eq_time
+            p_arrival = station.get('p_arrival')
+            if isinstance(p_arrival, (int, float, np.floating)):
+                return p_arrival
+            if ADVANCED_FEATURES and isinstance(p_arrival, UTCDateTime):
+                if eq_time is None:
+                    eq_time = UTCDateTime(earthquake.get('time'))
+                return p_arrival - eq_time
+            return np.nan
+        
+        count = len(stations)
+        distances = np.fromiter((s.get('distance_km', 0) for s in stations), dtype=np.float64, count=count)
+        p_observed = np.fromiter((p_seconds(s) for s in stations), dtype=np.float64, count=count)
+        
+        expected = distances / AVG_P_VELOCITY
+        time_diff = np.abs(p_observed - expected)
+        threshold = np.maximum(expected * TIMING_TOLERANCE, TIMING_MIN_THRESHOLD_S)
+        
+        # NaN (ukendt P-ankomst) sammenlignes aldrig som ugyldig
+        invalid = time_diff >= threshold
+        valid_mask = ~invalid
+        
+        messages = {
+            int(i): f"⚠️ Stor timing forskel ({time_diff[i]:.1f}s) - data kan være fra andet jordskælv"
+            for i in np.flatnonzero(invalid)
+        }
+        return valid_mask, time_diff, messages
+
     def design_custom_filter(self, filter_type, sampling_rate, order=4):
-        """Designer filter baseret på type"""
+        """Designer filter baseret på type. Returnerer (sos, beskrivelse)"""
         nyquist = sampling_rate / 2.0
         
         if filter_type in self.filter_bands:
             if self.filter_bands[filter_type] is None:
-                return None, None, "No filter"
+                return None, "No filter"
             low_freq, high_freq = self.filter_bands[filter_type]
         else:
-            return None, None, "Unknown filter"
+            return None, "Unknown filter"
             
         # Juster frekvenser hvis nødvendigt
         if high_freq > nyquist * 0.95:
             high_freq = nyquist * 0.9
             
-        b, a = butter(order, [low_freq/nyquist, high_freq/nyquist], btype='band')
-        return b, a, f"{filter_type}: {low_freq}-{high_freq} Hz"
+        sos = self._design_sos('bandpass', order, sampling_rate, low_freq, high_freq)
+        return sos, f"{filter_type}: {low_freq}-{high_freq} Hz"
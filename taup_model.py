@@ -0,0 +1,15 @@
+# taup_model.py
+"""
+Delt TauP model for GEOSeis 2.0
+Én iasp91 TauPyModel per proces - bruges af både data_manager og seismic_processor
+"""
+
+import streamlit as st
+from obspy.taup import TauPyModel
+
+
+@st.cache_resource(show_spinner=False)
+def get_cached_taup_model():
+    """Returnerer TauPyModel instans delt af alle sessioner i processen"""
+    print("Creating new TauPyModel instance...")
+    return TauPyModel(model="iasp91")
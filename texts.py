@@ -3,6 +3,10 @@ Alle tekster til GEOseis applikationen
 Redigér denne fil for at ændre tekster på dansk/engelsk
 """
 
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+
 # HOVEDTEKSTER - Redigér disse for at ændre app tekster
 texts = {
     'da': {
@@ -265,4 +269,33 @@ help_texts = {
 - Used for Ms magnitude calculation
         """
     }
-}
\ No newline at end of file
+}
+# Intern nøgler og tekster én gang ved import - ens tekster på tværs af sprog
+# (fx 'Data', 'Seismogram') deles, og opslag kan sammenligne pointere
+for _table in (texts, help_texts):
+    for _lang in _table:
+        _table[_lang] = {
+            sys.intern(key): sys.intern(value) if isinstance(value, str) else value
+            for key, value in _table[_lang].items()
+        }
+del _table, _lang
+
+# Skrivebeskyt tabellerne - ændringer skal ske i literalerne ovenfor
+texts = {lang: MappingProxyType(table) for lang, table in texts.items()}
+help_texts = {lang: MappingProxyType(table) for lang, table in help_texts.items()}
+
+# Flade opslagstabeller pr. sprog - bind én gang pr. render: T = get_texts(lang)
+TEXTS_DA = texts['da']
+TEXTS_EN = texts['en']
+LANG_TABLE = {'da': TEXTS_DA, 'en': TEXTS_EN}
+
+
+def get_texts(lang):
+    """Returnerer teksttabellen for sproget (engelsk hvis ukendt)"""
+    return LANG_TABLE.get(lang, TEXTS_EN)
+
+
+@lru_cache(maxsize=4096)
+def t(lang, key):
+    """Enkelt tekstopslag til views med én label - nøglen selv returneres hvis teksten mangler"""
+    return get_texts(lang).get(key, key)
@@ -6,91 +6,49 @@ Diskret feedback system med hvid baggrund og farvet venstre kant
 
 import streamlit as st
 import time
+from string import Template
 
-class ToastManager:
-    """
-    Diskret toast manager med hvid baggrund og farvet venstre kant.
-    Matcher bredden af filter-søjlen (ca. 350px).
-    """
-    
-    def __init__(self):
-        self.last_message = None
-        self.last_time = 0
-        self.shown_messages = set()  # Track viste beskeder
-        self.session_key = None  # Track current session (station/earthquake)
-        # Toast counter for unique IDs
-        if 'toast_counter' not in st.session_state:
-            st.session_state.toast_counter = 0
-    
-    def set_session_key(self, key):
-        """Set ny session key - rydder shown messages når ny station vælges."""
-        if key != self.session_key:
-            self.shown_messages.clear()
-            self.session_key = key
-    
-    def show_banner(self, message, banner_type='info', duration=3.0, details=None, once_per_session=False):
-        """Show diskret toast med hvid baggrund og farvet kant."""
-        import streamlit as st
-        import time
-        
-        # Kombiner message og details
-        full_message = message
-        if details:
-            full_message = f"{message} - {details}"
-        
-        # Check om beskeden allerede er vist i denne session
-        if once_per_session:
-            message_key = f"{message}_{details}"
-            if message_key in self.shown_messages:
-                return  # Skip hvis allerede vist
-            self.shown_messages.add(message_key)
-        
-        # Ikon og farver baseret på type
-        type_config = {
-            'success': {
-                'icon': '✓',  # Mindre diskret checkmark
-                'border_color': '#28a745',  # Grøn
-                'text_color': '#155724'
-            },
-            'error': {
-                'icon': '×',  # Diskret X
-                'border_color': '#dc3545',  # Rød
-                'text_color': '#721c24'
-            },
-            'warning': {
-                'icon': '!',  # Diskret udråbstegn
-                'border_color': '#ffc107',  # Gul
-                'text_color': '#856404'
-            },
-            'info': {
-                'icon': 'i',  # Diskret i
-                'border_color': '#17a2b8',  # Blå
-                'text_color': '#0c5460'
-            },
-            'loading': {
-                'icon': '⋯',  # Diskrete prikker
-                'border_color': '#6c757d',  # Grå
-                'text_color': '#383d41'
+# Banner type -> indeks i BANNER_CONFIG (ukendte typer vises som 'info')
+BANNER_TYPES = {'success': 0, 'error': 1, 'warning': 2, 'info': 3, 'loading': 4}
+DEFAULT_BANNER_INDEX = BANNER_TYPES['info']
+
+# Ikon og farver pr. type: (icon, border_color, text_color)
+BANNER_CONFIG = (
+    ('✓', '#28a745', '#155724'),  # success: mindre diskret checkmark, grøn
+    ('×', '#dc3545', '#721c24'),  # error: diskret X, rød
+    ('!', '#ffc107', '#856404'),  # warning: diskret udråbstegn, gul
+    ('i', '#17a2b8', '#0c5460'),  # info: diskret i, blå
+    ('⋯', '#6c757d', '#383d41'),  # loading: diskrete prikker, grå
+)
+
+# Animationer deles af alle toasts - sendes kun én gang pr. side
+TOAST_CSS = """
+        <style>
+        @keyframes slideInBottom {
+            from { 
+                transform: translateY(20px); 
+                opacity: 0; 
+            }
+            to { 
+                transform: translateY(0); 
+                opacity: 1; 
             }
         }
-        
-        config = type_config.get(banner_type, type_config['info'])
-        
-        # Undgå duplikater
-        current_time = time.time()
-        if self.last_message == full_message and (current_time - self.last_time) < 2:
-            return  # Skip duplicate
-        
-        # Unique toast ID
-        toast_id = f"toast-{st.session_state.toast_counter}"
-        st.session_state.toast_counter += 1
-        
-        # Duration i millisekunder
-        duration_ms = int(duration * 1000)
-        
-        # HTML og JavaScript - MEGET diskret design
-        st.markdown(f"""
-        <div id="{toast_id}" style="
+        @keyframes fadeOut {
+            from { 
+                opacity: 1; 
+            }
+            to { 
+                opacity: 0; 
+            }
+        }
+        </style>
+"""
+
+# Toast HTML - string.Template fordi CSS/JS krøllede parenteser så kan stå urørt.
+# Farver og ikon udfyldes én gang pr. type, kun id, besked og varighed pr. kald.
+TOAST_HTML = """
+        <div id="$toast_id" style="
             position: fixed;
             bottom: 20px;
             right: 20px;
@@ -105,8 +63,8 @@ class ToastManager:
             max-width: 250px;
             width: 250px;
             font-family: -apple-system, BlinkMacSystemFont, sans-serif;
-            border-left: 3px solid {config['border_color']};
-            color: {config['text_color']};
+            border-left: 3px solid $border_color;
+            color: $text_color;
             display: flex;
             align-items: center;
             gap: 8px;
@@ -120,46 +78,120 @@ class ToastManager:
                 align-items: center;
                 justify-content: center;
                 border-radius: 50%;
-                background: {config['border_color']}20;
-                color: {config['border_color']};
+                background: ${border_color}20;
+                color: $border_color;
                 flex-shrink: 0;
-            ">{config['icon']}</span>
-            <span style="flex: 1; line-height: 1.4;">{full_message}</span>
+            ">$icon</span>
+            <span style="flex: 1; line-height: 1.4;">$message</span>
         </div>
         
-        <style>
-        @keyframes slideInBottom {{
-            from {{ 
-                transform: translateY(20px); 
-                opacity: 0; 
-            }}
-            to {{ 
-                transform: translateY(0); 
-                opacity: 1; 
-            }}
-        }}
-        @keyframes fadeOut {{
-            from {{ 
-                opacity: 1; 
-            }}
-            to {{ 
-                opacity: 0; 
-            }}
-        }}
-        </style>
-        
         <script>
-        setTimeout(function() {{
-            const toast = document.getElementById('{toast_id}');
-            if (toast) {{
+        setTimeout(function() {
+            const toast = document.getElementById('$toast_id');
+            if (toast) {
                 toast.style.animation = 'fadeOut 0.2s ease-out';
-                setTimeout(function() {{
+                setTimeout(function() {
                     toast.remove();
-                }}, 200);
-            }}
-        }}, {duration_ms});
+                }, 200);
+            }
+        }, $duration_ms);
         </script>
-        """, unsafe_allow_html=True)
+        """
+
+TOAST_TEMPLATES = tuple(
+    Template(Template(TOAST_HTML).safe_substitute(icon=icon, border_color=border_color,
+                                                  text_color=text_color))
+    for icon, border_color, text_color in BANNER_CONFIG
+)
+
+class SessionField:
+    """
+    Attribut gemt i st.session_state under en fast nøgle, så en delt
+    instans stadig har separat tilstand pr. bruger/session.
+    """
+    
+    def __init__(self, key, default_factory):
+        self.key = key
+        self.default_factory = default_factory
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.key not in st.session_state:
+            st.session_state[self.key] = self.default_factory()
+        return st.session_state[self.key]
+    
+    def __set__(self, obj, value):
+        st.session_state[self.key] = value
+
+
+class ToastManager:
+    """
+    Diskret toast manager med hvid baggrund og farvet venstre kant.
+    Matcher bredden af filter-søjlen (ca. 350px).
+    
+    Én instans deles af processen (get_toast_manager) - tilstand pr. session
+    ligger i st.session_state og overlever derfor reruns.
+    """
+    
+    # Tilstand pr. session
+    last_message = SessionField('toast_last_message', lambda: None)
+    last_time = SessionField('toast_last_time', float)  # time.monotonic() for sidste toast
+    shown_messages = SessionField('toast_shown', set)  # Viste beskeder som (message, details)
+    session_key = SessionField('toast_session_key', lambda: None)  # Current station/earthquake
+    css_injected = SessionField('toast_css_injected', bool)  # TOAST_CSS sendt på denne side
+    
+    def __init__(self):
+        self.dedup_window = 2.0  # Sekunder hvor samme besked ikke vises igen
+        # Toast counter for unique IDs - delt, ID skal kun være unikt pr. side
+        self.toast_counter = 0
+    
+    def begin_run(self):
+        """Kaldes ved starten af hvert script run - siden bygges forfra, så CSS skal sendes igen."""
+        self.css_injected = False
+    
+    def set_session_key(self, key):
+        """Set ny session key - rydder shown messages når ny station vælges."""
+        if key != self.session_key:
+            # Nyt tomt set i stedet for clear() - det gamle frigives samlet
+            self.shown_messages = set()
+            self.session_key = key
+    
+    def show_banner(self, message, banner_type='info', duration=3.0, details=None, once_per_session=False):
+        """Show diskret toast med hvid baggrund og farvet kant."""
+        # Check om beskeden allerede er vist i denne session - før teksten bygges
+        if once_per_session:
+            message_key = (message, details)
+            if message_key in self.shown_messages:
+                return  # Skip hvis allerede vist
+            self.shown_messages.add(message_key)
+        
+        # Kombiner message og details
+        full_message = f"{message} - {details}" if details else message
+        
+        template = TOAST_TEMPLATES[BANNER_TYPES.get(banner_type, DEFAULT_BANNER_INDEX)]
+        
+        # Undgå duplikater
+        current_time = time.monotonic()
+        if self.last_message == full_message and (current_time - self.last_time) < self.dedup_window:
+            return  # Skip duplicate
+        
+        # Unique toast ID
+        self.toast_counter += 1
+        toast_id = f"toast-{self.toast_counter}"
+        
+        # Duration i millisekunder
+        duration_ms = int(duration * 1000)
+        
+        # Keyframes kun ved første toast
+        if not self.css_injected:
+            st.markdown(TOAST_CSS, unsafe_allow_html=True)
+            self.css_injected = True
+        
+        # HTML og JavaScript - MEGET diskret design
+        st.markdown(template.substitute(toast_id=toast_id, message=full_message,
+                                        duration_ms=duration_ms),
+                    unsafe_allow_html=True)
         
         # Opdater tracking
         self.last_message = full_message
@@ -173,18 +205,15 @@ class ToastManager:
         self.show_banner(message, banner_type=toast_type, duration=duration, 
                         details=context, once_per_session=once_per_session)
     
-    def render_banner(self):
-        """Compatibility method - does nothing with this implementation."""
-        pass
-    
-    def render(self):
-        """Compatibility method - does nothing with this implementation."""
-        pass
-    
-    def clear_banners(self):
+    def render(self, *args, **kwargs):
         """Compatibility method - does nothing with this implementation."""
         pass
     
-    def clear(self):
-        """Compatibility method - does nothing with this implementation."""
-        pass
\ No newline at end of file
+    # Øvrige compatibility navne deler samme no-op
+    render_banner = clear_banners = clear = render
+
+
+@st.cache_resource(show_spinner=False)
+def get_toast_manager():
+    """Returnerer ToastManager delt af alle sessioner i processen"""
+    return ToastManager()
@@ -4,11 +4,18 @@ Waveform visualisering modul for GEOSeis 2.0
 Håndterer plotting af seismiske data med Plotly
 """
 
+import re
+import logging
+from functools import lru_cache
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import streamlit as st
 
+# Diagnostik fra plotting - DEBUG linjer formateres kun når niveauet er slået til
+logger = logging.getLogger(__name__)
+
 # Try to import ObsPy for UTCDateTime parsing
 try:
     from obspy import UTCDateTime as ObsPyUTCDateTime
@@ -16,6 +23,68 @@ try:
 except ImportError:
     OBSPY_AVAILABLE = False
 
+# Valgfri: tsdownsample (Rust/SIMD) MinMaxLTTB downsampling til plots
+try:
+    from tsdownsample import MinMaxLTTBDownsampler
+    TSDOWNSAMPLE_AVAILABLE = True
+    PLOT_DOWNSAMPLER = MinMaxLTTBDownsampler()
+except ImportError:
+    TSDOWNSAMPLE_AVAILABLE = False
+    PLOT_DOWNSAMPLER = None
+
+# Valgfri: orjson serialiserer figurens float32 arrays direkte (plotly >= 5.4)
+try:
+    import orjson  # noqa: F401
+    ORJSON_AVAILABLE = True
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Standard antal punkter pr. komponent sendt til browseren
+DEFAULT_PLOT_POINTS = 8000
+
+# Farver fra v1.7 (default_colors) og farver/symboler i seismogram plottet
+DEFAULT_COLORS = {
+    'north': '#FF6B6B',      # Rød (identisk med v1.7)
+    'east': '#4ECDC4',       # Turkis/Grøn 
+    'vertical': '#45B7D1'    # Blå
+}
+COMPONENT_COLORS = {'north': 'red', 'east': 'green', 'vertical': 'blue'}
+COMPONENT_SYMBOLS = {'north': '🔴', 'east': '🟢', 'vertical': '🔵'}
+DEFAULT_COMPONENTS = {'north': True, 'east': True, 'vertical': True}
+
+# Kanal suffix -> komponent navn (senere nøgler vinder ved dubletter, som før)
+COMP_MAP = {'Z': 'vertical', 'N': 'north', 'E': 'east', '1': 'north', '2': 'east', '3': 'vertical'}
+# waveform_data nøgle for komponent-specifik tidsakse -> komponent navn
+TIME_KEY_MAP = {f'time_{comp}': canonical for comp, canonical in COMP_MAP.items()}
+
+# "UTCDateTime(2025, 1, 7, 1, 8, 36, 353168)" strings fra session/export
+UTC_DATETIME_RE = re.compile(r'UTCDateTime\(([^)]*)\)')
+
+
+@lru_cache(maxsize=256)
+def cached_eq_utc(eq_time_str):
+    """Jordskælvstid som UTCDateTime - samme streng parses kun én gang"""
+    return ObsPyUTCDateTime(eq_time_str)
+
+
+def eq_utc(eq_time):
+    """UTCDateTime for jordskælvstid; strenge caches, UTCDateTime (ikke hashbar) bruges direkte"""
+    if isinstance(eq_time, str):
+        return cached_eq_utc(eq_time)
+    return ObsPyUTCDateTime(eq_time)
+
+
+@lru_cache(maxsize=16)
+def generated_time_array(data_len, sampling_rate):
+    """
+    Tidsakse (s) for data uden egen time array. Deles mellem reruns,
+    derfor skrivebeskyttet.
+    """
+    times = np.arange(data_len, dtype=np.float32) / np.float32(sampling_rate)
+    times.flags.writeable = False
+    return times
+
 
 def parse_arrival_time(arrival_value, eq_time_str=None):
     """
@@ -35,12 +104,10 @@ def parse_arrival_time(arrival_value, eq_time_str=None):
         if 'UTCDateTime' in arrival_value and OBSPY_AVAILABLE:
             try:
                 # Parse UTCDateTime string: "UTCDateTime(2025, 1, 7, 1, 8, 36, 353168)"
-                import re
-                match = re.search(r'UTCDateTime\((.*?)\)', arrival_value)
+                match = UTC_DATETIME_RE.search(arrival_value)
                 if match:
-                    params = [x.strip() for x in match.group(1).split(',')]
-                    # Konverter til integers
-                    params = [int(p) for p in params]
+                    # Konverter til integers (int() tolererer omgivende mellemrum)
+                    params = tuple(int(p) for p in match.group(1).split(','))
                     
                     # Opret UTCDateTime objekt
                     arrival_utc = ObsPyUTCDateTime(*params)
@@ -48,36 +115,119 @@ def parse_arrival_time(arrival_value, eq_time_str=None):
                     # Hvis vi har earthquake time, beregn relative sekunder
                     if eq_time_str:
                         try:
-                            # Parse earthquake time
-                            eq_utc = ObsPyUTCDateTime(eq_time_str)
-                            
                             # Returner sekunder fra jordskælv
-                            return float(arrival_utc - eq_utc)
+                            return float(arrival_utc - eq_utc(eq_time_str))
                         except Exception as e:
-                            print(f"Could not parse earthquake time: {eq_time_str}, error: {e}")
+                            logger.warning("Could not parse earthquake time: %s, error: %s", eq_time_str, e)
                             pass
                     
                     # Ellers returner som sekunder siden epoch (fallback)
                     return float(arrival_utc.timestamp)
             except Exception as e:
-                print(f"Could not parse UTCDateTime string: {arrival_value}, error: {e}")
+                logger.warning("Could not parse UTCDateTime string: %s, error: %s", arrival_value, e)
                 return None
     
     # Hvis det er et UTCDateTime objekt
     try:
         if isinstance(arrival_value, ObsPyUTCDateTime) and OBSPY_AVAILABLE:
             if eq_time_str:
-                eq_utc = ObsPyUTCDateTime(eq_time_str)
-                return float(arrival_value - eq_utc)
+                return float(arrival_value - eq_utc(eq_time_str))
             else:
                 return float(arrival_value.timestamp)
     except:
         pass
     
-    print(f"Could not parse arrival time: {arrival_value} (type: {type(arrival_value)})")
+    logger.warning("Could not parse arrival time: %s (type: %s)", arrival_value, type(arrival_value))
     return None
 
 
+def peak_index(data_array):
+    """Indeks for største |værdi| via argmax/argmin - uden abs-kopi af data"""
+    max_idx = int(np.argmax(data_array))
+    min_idx = int(np.argmin(data_array))
+    return min_idx if -data_array[min_idx] > data_array[max_idx] else max_idx
+
+
+def stacked_peak_indices(segments):
+    """
+    peak_index for flere lige lange segmenter i én vektoriseret (N, len) reduktion.
+    Segmenter med forskellig længde reduceres enkeltvis.
+    """
+    if len({len(segment) for segment in segments}) != 1:
+        return [peak_index(np.asarray(segment)) for segment in segments]
+    stacked = np.stack(segments)
+    rows = np.arange(len(stacked))
+    max_idx = stacked.argmax(axis=1)
+    min_idx = stacked.argmin(axis=1)
+    peaks = np.where(-stacked[rows, min_idx] > stacked[rows, max_idx], min_idx, max_idx)
+    return peaks.tolist()
+
+
+def peak_downsample_indices(data_array, max_pts):
+    """
+    Indekser for peak-bevarende downsampling: største |værdi| i hver bucket.
+    Bucket grænserne er brøkdele af sporet (som GEOSeis 1.7), så resten fordeles
+    over alle buckets og hele sporet dækkes.
+    Max/min pr. bucket findes med reduceat direkte på sporet, og peakens position
+    søges offset for offset - kun arrays på max_pts elementer, sporet kopieres aldrig.
+    """
+    data_len = len(data_array)
+    starts = np.arange(max_pts, dtype=np.int64) * data_len // max_pts
+    ends = np.append(starts[1:], data_len)
+    
+    max_vals = np.maximum.reduceat(data_array, starts)
+    min_vals = np.minimum.reduceat(data_array, starts)
+    # Negativ peak vinder kun hvis den er strengt større i absolut værdi
+    targets = np.where(-min_vals > max_vals, min_vals, max_vals)
+    
+    # Første forekomst af peak værdien i hver bucket (som argmax/argmin)
+    indices = starts.copy()
+    pending = np.ones(max_pts, dtype=bool)
+    for offset in range(int((ends - starts).max())):
+        positions = starts + offset
+        hit = pending & (positions < ends)
+        hit[hit] = data_array[positions[hit]] == targets[hit]
+        indices[hit] = positions[hit]
+        pending &= ~hit
+        if not pending.any():
+            break
+    return indices
+
+
+def has_finite_values(data_array, probe_size=1024):
+    """
+    True hvis arrayet har mindst én endelig værdi. Normale spor afgøres på
+    de første probe_size samples - kun NaN/inf-tunge spor scannes helt.
+    """
+    if len(data_array) == 0:
+        return False
+    return bool(np.isfinite(data_array[:probe_size]).any() or np.isfinite(data_array).any())
+
+
+def nearest_index(sorted_array, value):
+    """Indeks for værdien nærmest value i et stigende array (binær søgning)"""
+    idx = int(np.searchsorted(sorted_array, value))
+    if idx >= len(sorted_array):
+        return len(sorted_array) - 1
+    # Vælg venstre nabo hvis den er (mindst lige så) tæt på - som argmin
+    if idx > 0 and value - sorted_array[idx - 1] <= sorted_array[idx] - value:
+        return idx - 1
+    return idx
+
+
+def plot_downsample_indices(times_array, data_array, max_pts):
+    """
+    Indekser til plot-downsampling. MinMaxLTTB via tsdownsample hvis
+    installeret (bevarer både amplitude og form), ellers peak buckets.
+    """
+    if TSDOWNSAMPLE_AVAILABLE:
+        try:
+            return PLOT_DOWNSAMPLER.downsample(times_array, data_array, n_out=max_pts)
+        except Exception as e:
+            # Fx NaN eller ikke-monoton tid - brug NumPy versionen
+            logger.warning("tsdownsample fejlede, bruger peak downsampling: %s", e)
+    return peak_downsample_indices(data_array, max_pts)
+
 
 class WaveformVisualizer:
     """
@@ -86,11 +236,7 @@ class WaveformVisualizer:
     """
     
     def __init__(self):
-        self.default_colors = {
-            'north': '#FF6B6B',      # Rød (identisk med v1.7)
-            'east': '#4ECDC4',       # Turkis/Grøn 
-            'vertical': '#45B7D1'    # Blå
-        }
+        self.default_colors = DEFAULT_COLORS
     
     def downsample_data(self, data, max_points=8000, return_indices=False):
         """
@@ -104,7 +250,8 @@ class WaveformVisualizer:
         
         # Beregn downsampling faktor
         factor = len(data) // max_points
-        indices = np.arange(0, len(data), factor)[:max_points]
+        # Præcis max_points indekser - ingen overallokering + slice
+        indices = np.arange(max_points, dtype=np.int64) * factor
         
         if return_indices:
             return data[indices], indices
@@ -112,15 +259,29 @@ class WaveformVisualizer:
 
     def create_waveform_plot(self, waveform_data, show_components=None, 
                             show_arrivals=True, title="Seismogram",
-                            height=600):
+                            height=600, max_points=DEFAULT_PLOT_POINTS):
         """
         Opretter interaktivt seismogram plot med Plotly.
+        Cached (st.cache_data) på de data plottet bruger - reruns med uændrede
+        data genbruger figuren. Returnerer en ny kopi, så den må ændres af kalderen.
+        """
+        if not waveform_data:
+            return None
+        return cached_waveform_plot(self, plot_input(waveform_data), show_components,
+                                    show_arrivals, title, height, max_points)
+    
+    def build_waveform_plot(self, waveform_data, show_components=None, 
+                            show_arrivals=True, title="Seismogram",
+                            height=600, max_points=DEFAULT_PLOT_POINTS):
+        """
+        Bygger interaktivt seismogram plot med Plotly (uden cache).
         FIXED: Robust håndtering af filtrerede data arrays.
+        max_points styrer hvor mange punkter pr. komponent der sendes til browseren.
         """
         try:
             # Default komponenter
             if show_components is None:
-                show_components = {'north': True, 'east': True, 'vertical': True}
+                show_components = DEFAULT_COMPONENTS
             
             # Hent displacement data
             displacement_data = waveform_data.get('displacement_data', {})
@@ -131,48 +292,37 @@ class WaveformVisualizer:
             cleaned_displacement_data = {}
             for comp_name, comp_data in displacement_data.items():
                 if comp_data is not None:
-                    # Konverter til numpy array
-                    arr = np.array(comp_data)
+                    # Konverter til float32 plot-kopi - original data i waveform_data røres ikke
+                    arr = np.asarray(comp_data, dtype=np.float32)
                     
                     # Sørg for at det er 1D
                     if arr.ndim > 1:
-                        print(f"WARNING: {comp_name} has shape {arr.shape}, flattening to 1D")
+                        logger.warning("%s has shape %s, flattening to 1D", comp_name, arr.shape)
                         arr = arr.flatten()
                     
                     # Check for valid data
-                    if len(arr) > 0 and np.any(np.isfinite(arr)):
+                    if has_finite_values(arr):
                         cleaned_displacement_data[comp_name] = arr
                     else:
-                        print(f"WARNING: {comp_name} has no valid data")
+                        logger.warning("%s has no valid data", comp_name)
             
             displacement_data = cleaned_displacement_data
             
             if not displacement_data:
-                print("ERROR: No valid displacement data after cleaning")
+                logger.error("No valid displacement data after cleaning")
                 return None
             
             # Hent time arrays
             time_arrays = {}
             times = waveform_data.get('time', np.array([]))
             
-            # Konverter times til numpy array hvis det ikke allerede er det
-            if not isinstance(times, np.ndarray):
-                times = np.array(times)
+            # Konverter times til float32 numpy array (rigeligt til plot akser)
+            times = np.asarray(times, dtype=np.float32)
             
             # Check for komponent-specifikke time arrays
-            for comp in ['Z', 'N', 'E', '1', '2', '3']:
-                if f'time_{comp}' in waveform_data:
-                    time_arr = waveform_data[f'time_{comp}']
-                    if not isinstance(time_arr, np.ndarray):
-                        time_arr = np.array(time_arr)
-                    
-                    # Map til standard navn
-                    if comp in ['Z', '3']:
-                        time_arrays['vertical'] = time_arr
-                    elif comp in ['N', '1']:
-                        time_arrays['north'] = time_arr
-                    elif comp in ['E', '2']:
-                        time_arrays['east'] = time_arr
+            for key, canonical in TIME_KEY_MAP.items():
+                if key in waveform_data:
+                    time_arrays[canonical] = np.asarray(waveform_data[key], dtype=np.float32)
             
             # Fallback til generel time array
             if not time_arrays:
@@ -185,8 +335,8 @@ class WaveformVisualizer:
                         else:
                             # Generer time array baseret på sampling rate
                             sampling_rate = waveform_data.get('sampling_rate', 100)
-                            time_arrays[comp] = np.arange(data_len) / sampling_rate
-                            print(f"Generated time array for {comp}: {data_len} samples at {sampling_rate} Hz")
+                            time_arrays[comp] = generated_time_array(data_len, float(sampling_rate))
+                            logger.debug("Generated time array for %s: %d samples at %s Hz", comp, data_len, sampling_rate)
             
             # Hent metadata
             units = waveform_data.get('units', 'mm')
@@ -204,20 +354,16 @@ class WaveformVisualizer:
             s_arrival = parse_arrival_time(s_arrival, eq_time)
             surface_arrival = parse_arrival_time(surface_arrival, eq_time)
             
-            # INTELLIGENT DOWNSAMPLING FOR VISUALISERING
-            max_points = 8000  # Maks punkter for smooth performance
-            
+            # INTELLIGENT DOWNSAMPLING FOR VISUALISERING (max_points for smooth performance)
             def downsample_for_plotting(times_array, data_array, max_pts=max_points):
                 """
                 Intelligent downsampling der bevarer peaks og vigtige features.
                 Kun til visualisering - original data forbliver uændret.
                 """
                 try:
-                    # Ensure we have numpy arrays
-                    if not isinstance(data_array, np.ndarray):
-                        data_array = np.array(data_array)
-                    if not isinstance(times_array, np.ndarray):
-                        times_array = np.array(times_array)
+                    # Ensure we have numpy arrays (ingen kopi hvis de allerede er float32)
+                    data_array = np.asarray(data_array, dtype=np.float32)
+                    times_array = np.asarray(times_array, dtype=np.float32)
                     
                     # Validate arrays
                     if len(data_array) == 0 or len(times_array) == 0:
@@ -226,7 +372,7 @@ class WaveformVisualizer:
                     # Ensure samme længde
                     min_len = min(len(times_array), len(data_array))
                     if len(times_array) != len(data_array):
-                        print(f"WARNING: Time and data arrays have different lengths ({len(times_array)} vs {len(data_array)})")
+                        logger.warning("Time and data arrays have different lengths (%d vs %d)", len(times_array), len(data_array))
                         times_array = times_array[:min_len]
                         data_array = data_array[:min_len]
                     
@@ -237,41 +383,20 @@ class WaveformVisualizer:
                         return times_array, data_array
                     
                     # Peak-preserving downsampling
-                    downsample_factor = data_len / max_pts
-                    indices = []
-                    
-                    for i in range(max_pts):
-                        start_idx = int(i * downsample_factor)
-                        end_idx = min(int((i + 1) * downsample_factor), data_len)
-                        
-                        if start_idx < data_len and end_idx <= data_len and start_idx < end_idx:
-                            # Find peak (max absolute value) i dette vindue
-                            window = data_array[start_idx:end_idx]
-                            if len(window) > 0:
-                                peak_idx = np.argmax(np.abs(window))
-                                indices.append(start_idx + peak_idx)
-                    
-                    if indices:
-                        indices = np.array(indices)
-                        return times_array[indices], data_array[indices]
-                    else:
-                        # Fallback to simple downsampling
-                        step = max(1, data_len // max_pts)
-                        return times_array[::step], data_array[::step]
+                    indices = plot_downsample_indices(times_array, data_array, max_pts)
+                    return times_array[indices], data_array[indices]
                         
                 except Exception as e:
-                    print(f"Downsample error: {e}")
+                    logger.warning("Downsample error: %s", e)
                     # Return original if error
                     return times_array, data_array
             
-            # Create figure
+            # Create figure - traces samles og tilføjes i ét add_traces kald
             fig = go.Figure()
+            traces = []
             
             # Plot hver komponent
-            colors = {'north': 'red', 'east': 'green', 'vertical': 'blue'}
-            symbols = {'north': '🔴', 'east': '🟢', 'vertical': '🔵'}
-            
-            for comp_name, comp_color in colors.items():
+            for comp_name, comp_color in COMPONENT_COLORS.items():
                 if show_components.get(comp_name, True) and comp_name in displacement_data:
                     # Hent fuld opløsnings data
                     comp_times = time_arrays.get(comp_name, times)
@@ -280,18 +405,22 @@ class WaveformVisualizer:
                     # Downsample KUN for plotting
                     plot_times, plot_data = downsample_for_plotting(comp_times, comp_data)
                     
-                    print(f"DEBUG: {comp_name} - Original: {len(comp_data)} points, Plot: {len(plot_data)} points")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("%s - Original: %d points, Plot: %d points",
+                                     comp_name, len(comp_data), len(plot_data))
                     
-                    # Tilføj trace
-                    fig.add_trace(go.Scatter(
+                    # Tilføj trace - WebGL rendering til de lange spor
+                    traces.append(go.Scattergl(
                         x=plot_times,
                         y=plot_data,
                         mode='lines',
-                        name=f'{symbols[comp_name]} {comp_name.capitalize()} ({data_label})',
+                        name=f'{COMPONENT_SYMBOLS[comp_name]} {comp_name.capitalize()} ({data_label})',
                         line=dict(color=comp_color, width=1.5),
                         hovertemplate='Tid: %{x:.2f} s<br>Amplitude: %{y:.2f} ' + data_label + '<extra></extra>'
                     ))
             
+            fig.add_traces(traces)
+            
             # Tilføj arrival time linjer
             if show_arrivals:
                 # P-wave
@@ -357,14 +486,22 @@ class WaveformVisualizer:
             return fig
             
         except Exception as e:
-            print(f"Error creating waveform plot: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error creating waveform plot: %s", e)
             return None
 
-    def create_p_wave_zoom_plot(self, waveform_data, station_info, processed_data=None):
+    def create_p_wave_zoom_plot(self, waveform_data, station_info):
         """
-        Opretter zoom plot omkring P-bølge ankomst
+        Opretter zoom plot omkring P-bølge ankomst - cached som create_waveform_plot.
+        Returnerer (fig, peak_info).
+        """
+        if not waveform_data or not station_info:
+            return None, None
+        return cached_p_wave_zoom_plot(self, plot_input(waveform_data),
+                                       {'p_arrival': station_info.get('p_arrival')})
+    
+    def build_p_wave_zoom_plot(self, waveform_data, station_info):
+        """
+        Bygger zoom plot omkring P-bølge ankomst (uden cache)
         Implementering fra GEOSeis 1.7 med STA/LTA detektion
         """
         if not waveform_data or not station_info:
@@ -372,7 +509,8 @@ class WaveformVisualizer:
             
         time_array = waveform_data.get('time')
         if time_array is None:
-            time_array = waveform_data.get('time_array', np.array([]))
+            time_array = waveform_data.get('time_array', ())
+        time_array = np.asarray(time_array, dtype=np.float32)
             
         sampling_rate = waveform_data.get('sampling_rate', 100)
         p_arrival = station_info.get('p_arrival')
@@ -386,7 +524,7 @@ class WaveformVisualizer:
             return None, None
             
         # Find index for P-wave
-        p_index = np.argmin(np.abs(time_array - p_arrival))
+        p_index = nearest_index(time_array, p_arrival)
         
         # Definer zoom vindue (10 sekunder før, 20 sekunder efter)
         zoom_start = max(0, p_index - int(10 * sampling_rate))
@@ -409,57 +547,67 @@ class WaveformVisualizer:
         
         peak_info = {}
         
-        for idx, (comp, color) in enumerate(zip(components, colors)):
-            if comp in displacement_data:
-                data = displacement_data[comp][zoom_start:zoom_end]
-                time = time_array[zoom_start:zoom_end]
-                
-                # Plot waveform
-                fig.add_trace(
-                    go.Scatter(
-                        x=time,
-                        y=data,
-                        mode='lines',
-                        name=comp.capitalize(),
-                        line=dict(color=color, width=1),
-                        showlegend=False
-                    ),
-                    row=idx+1, col=1
-                )
-                
-                # Marker P-wave
-                fig.add_vline(
-                    x=p_arrival,
-                    line_dash="dash",
-                    line_color="black",
-                    annotation_text="P",
-                    annotation_position="top",
-                    row=idx+1, col=1
+        # Traces og subplot rækker samles og tilføjes i ét add_traces kald
+        traces = []
+        trace_rows = []
+        
+        # Zoom udsnit af de tilgængelige komponenter - peaks findes samlet for alle
+        present = [(idx, comp, color) for idx, (comp, color) in enumerate(zip(components, colors))
+                   if comp in displacement_data]
+        segments = [displacement_data[comp][zoom_start:zoom_end] for _, comp, _ in present]
+        peak_indices = stacked_peak_indices(segments) if segments else []
+        time = time_array[zoom_start:zoom_end]
+        
+        for (idx, comp, color), data, peak_idx in zip(present, segments, peak_indices):
+            # Plot waveform (WebGL - peak markøren forbliver SVG)
+            traces.append(
+                go.Scattergl(
+                    x=time,
+                    y=data,
+                    mode='lines',
+                    name=comp.capitalize(),
+                    line=dict(color=color, width=1),
+                    showlegend=False
                 )
-                
-                # Find peak amplitude i vinduet
-                peak_idx = np.argmax(np.abs(data))
-                peak_time = time[peak_idx]
-                peak_value = data[peak_idx]
-                
-                peak_info[comp] = {
-                    'time': peak_time,
-                    'amplitude': peak_value,
-                    'delay_from_p': peak_time - p_arrival
-                }
-                
-                # Marker peak
-                fig.add_trace(
-                    go.Scatter(
-                        x=[peak_time],
-                        y=[peak_value],
-                        mode='markers',
-                        marker=dict(color='orange', size=8),
-                        showlegend=False,
-                        hovertemplate=f'Peak: {peak_value:.2f} mm<br>Time: {peak_time:.2f} s'
-                    ),
-                    row=idx+1, col=1
+            )
+            trace_rows.append(idx+1)
+            
+            # Peak amplitude i vinduet
+            peak_time = time[peak_idx]
+            peak_value = data[peak_idx]
+            
+            peak_info[comp] = {
+                'time': peak_time,
+                'amplitude': peak_value,
+                'delay_from_p': peak_time - p_arrival
+            }
+            
+            # Marker peak
+            traces.append(
+                go.Scatter(
+                    x=[peak_time],
+                    y=[peak_value],
+                    mode='markers',
+                    marker=dict(color='orange', size=8),
+                    showlegend=False,
+                    hovertemplate=f'Peak: {peak_value:.2f} mm<br>Time: {peak_time:.2f} s'
                 )
+            )
+            trace_rows.append(idx+1)
+        
+        if traces:
+            fig.add_traces(traces, rows=trace_rows, cols=[1] * len(traces))
+        
+        # Marker P-wave - efter traces, da add_vline springer tomme subplots over
+        for row in sorted(set(trace_rows)):
+            fig.add_vline(
+                x=p_arrival,
+                line_dash="dash",
+                line_color="black",
+                annotation_text="P",
+                annotation_position="top",
+                row=row, col=1
+            )
         
         # Update layout
         fig.update_layout(
@@ -474,3 +622,42 @@ class WaveformVisualizer:
         fig.update_yaxes(title_text="mm", row=2, col=1)
         
         return fig, peak_info
+
+
+# Nøgler i waveform_data som plottene bruger - kun disse indgår i cache nøglen
+PLOT_INPUT_KEYS = ('displacement_data', 'time', 'time_array', 'sampling_rate', 'units', 'earthquake_time')
+ARRIVAL_KEYS = ('p_arrival', 's_arrival', 'surface_arrival')
+
+
+def plot_input(waveform_data):
+    """
+    Udtræk af waveform_data med kun det plottene læser. Holder cache nøglen
+    fri for raw_data, components, filtrerede datasæt osv.
+    """
+    data = {key: waveform_data[key] for key in PLOT_INPUT_KEYS if key in waveform_data}
+    for key in TIME_KEY_MAP:
+        if key in waveform_data:
+            data[key] = waveform_data[key]
+    station_info = waveform_data.get('station_info') or {}
+    data['station_info'] = {key: station_info.get(key) for key in ARRIVAL_KEYS}
+    return data
+
+
+@st.cache_data(max_entries=32, ttl=600, show_spinner=False)
+def cached_waveform_plot(_visualizer, waveform_data, show_components, show_arrivals,
+                         title, height, max_points):
+    """Cached seismogram figur - Streamlit hasher data arrays (store arrays samples)"""
+    return _visualizer.build_waveform_plot(waveform_data, show_components, show_arrivals,
+                                           title, height, max_points)
+
+
+@st.cache_data(max_entries=32, ttl=600, show_spinner=False)
+def cached_p_wave_zoom_plot(_visualizer, waveform_data, station_info):
+    """Cached P-bølge zoom figur og peak info"""
+    return _visualizer.build_p_wave_zoom_plot(waveform_data, station_info)
+
+
+@st.cache_resource(show_spinner=False)
+def get_waveform_visualizer():
+    """Returnerer WaveformVisualizer delt af alle sessioner (klassen har ingen tilstand)"""
+    return WaveformVisualizer()